@@ -1,29 +1,297 @@
 import asyncio
-import json
-from typing import Callable, Any
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Any, Dict, List
+
+from app.core import metrics
+from app.core.config import settings
+from app.utils.serializers import dumps
 
 CHANNEL_NAME = "quickpoll:events"
 
-_subscribers = {}
+logger = logging.getLogger(__name__)
+
+
+class BroadcastBackend(ABC):
+    """
+    Transport used by the Broadcaster. Backends deliver every message published
+    on a subscribed channel (by any process) to `on_message(channel, data)`.
+    """
+
+    @abstractmethod
+    async def connect(self, on_message: Callable[[str, str], Any]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def disconnect(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish(self, channel: str, data: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def subscribe(self, channel: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def next_seq(self, key: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def current_seq(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(BroadcastBackend):
+    """In-process stand-in with the same API; events never leave the worker."""
+
+    def __init__(self):
+        self._on_message = None
+        self._channels = set()
+        self._sequences: Dict[str, int] = {}
+
+    async def connect(self, on_message):
+        self._on_message = on_message
+
+    async def disconnect(self):
+        self._on_message = None
+
+    async def publish(self, channel, data):
+        if self._on_message is not None and channel in self._channels:
+            await self._on_message(channel, data)
+
+    async def subscribe(self, channel):
+        self._channels.add(channel)
+
+    async def unsubscribe(self, channel):
+        self._channels.discard(channel)
+
+    async def next_seq(self, key):
+        seq = self._sequences.get(key, 0) + 1
+        self._sequences[key] = seq
+        return seq
+
+    async def current_seq(self, key):
+        return self._sequences.get(key, 0)
+
+
+class RedisBackend(BroadcastBackend):
+    """
+    Redis pub/sub over a shared connection pool.
+
+    Publishes are queued and sent by a single writer task in pipelined
+    batches; the subscriber connection reconnects with exponential backoff
+    and re-subscribes to every channel. Sequence numbers use INCR so they
+    are shared by all workers.
+    """
+
+    def __init__(self, url: str, max_connections: int, publish_batch: int,
+                 publish_queue_size: int, reconnect_max_seconds: float):
+        self.url = url
+        self.max_connections = max_connections
+        self.publish_batch = publish_batch
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=publish_queue_size)
+        self._channels = set()
+        self._on_message = None
+        self._redis = None
+        self._pubsub = None
+        self._retry_errors = (ConnectionError, OSError)
+        self._tasks: List[asyncio.Task] = []
+
+    async def connect(self, on_message):
+        import redis.asyncio as redis
+        from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+        self._retry_errors = (ConnectionError, OSError, RedisConnectionError, RedisTimeoutError)
+        self._on_message = on_message
+        pool = redis.ConnectionPool.from_url(self.url, max_connections=self.max_connections, decode_responses=True)
+        self._redis = redis.Redis(connection_pool=pool)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._tasks = [asyncio.create_task(self._reader()), asyncio.create_task(self._writer())]
 
-async def publish(channel: str, message: dict):
-    # In production publish to Redis/Other
-    # Here it's a no-op or in-memory dispatch.
-    data = json.dumps(message, default=str)
-    # attempt to call coroutine subscribers
-    for cb in list(_subscribers.get(channel, [])):
+    async def disconnect(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # best effort: send whatever is still queued
+        batch = self._drain()
+        if batch:
+            try:
+                await self._send(batch)
+            except Exception:
+                logger.warning("dropped %d queued events on shutdown", len(batch))
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        if self._redis is not None:
+            await self._redis.close()
+            await self._redis.connection_pool.disconnect()
+
+    async def publish(self, channel, data):
         try:
-            if asyncio.iscoroutinefunction(cb):
-                await cb(data)
-            else:
-                cb(data)
-        except Exception:
-            pass
-
-def subscribe(channel: str, callback: Callable[[Any], Any]):
-    _subscribers.setdefault(channel, []).append(callback)
-
-def unsubscribe(channel: str, callback: Callable[[Any], Any]):
-    lst = _subscribers.get(channel, [])
-    if callback in lst:
-        lst.remove(callback)
+            self._outbox.put_nowait((channel, data))
+        except asyncio.QueueFull:
+            logger.warning("broadcast outbox full, dropping event on %s", channel)
+
+    async def subscribe(self, channel):
+        self._channels.add(channel)
+        await self._pubsub.subscribe(channel)
+
+    async def unsubscribe(self, channel):
+        self._channels.discard(channel)
+        await self._pubsub.unsubscribe(channel)
+
+    async def next_seq(self, key):
+        return await self._redis.incr(f"{CHANNEL_NAME}:seq:{key}")
+
+    async def current_seq(self, key):
+        value = await self._redis.get(f"{CHANNEL_NAME}:seq:{key}")
+        return int(value or 0)
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.publish_batch:
+            try:
+                batch.append(self._outbox.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _send(self, batch):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for channel, data in batch:
+                pipe.publish(channel, data)
+            await pipe.execute()
+
+    async def _writer(self):
+        delay = 0.1
+        while True:
+            batch = [await self._outbox.get()]
+            batch.extend(self._drain())
+            while True:
+                try:
+                    await self._send(batch)
+                    delay = 0.1
+                    break
+                except self._retry_errors as exc:
+                    logger.warning("redis publish failed (%s), retrying in %.1fs", exc, delay)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.reconnect_max_seconds)
+                except Exception:
+                    # not a connection problem, so resending the same batch would
+                    # fail the same way; drop it but keep the writer alive
+                    logger.exception("redis publish failed, dropping %d events", len(batch))
+                    break
+
+    async def _reader(self):
+        delay = 0.1
+        while True:
+            try:
+                if not self._channels:
+                    await asyncio.sleep(0.1)
+                    continue
+                if not self._pubsub.subscribed:
+                    await self._pubsub.subscribe(*self._channels)
+                async for message in self._pubsub.listen():
+                    delay = 0.1
+                    if message["type"] == "message":
+                        await self._on_message(message["channel"], message["data"])
+            except Exception as exc:
+                if isinstance(exc, self._retry_errors):
+                    logger.warning("redis subscriber lost (%s), reconnecting in %.1fs", exc, delay)
+                else:
+                    logger.exception("redis subscriber failed, resubscribing in %.1fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_seconds)
+                try:
+                    await self._pubsub.reset()
+                except Exception:
+                    pass
+
+
+class Broadcaster:
+    """Dispatches channel messages from the backend to local callbacks."""
+
+    def __init__(self, backend: BroadcastBackend):
+        self.backend = backend
+        self._subscribers: Dict[str, list] = {}
+        self._connected = False
+
+    async def connect(self):
+        if not self._connected:
+            await self.backend.connect(self._dispatch)
+            self._connected = True
+
+    async def disconnect(self):
+        if self._connected:
+            await self.backend.disconnect()
+            self._connected = False
+
+    async def publish(self, channel: str, message: dict):
+        data = dumps(message).decode()
+        started = time.perf_counter() if metrics.ENABLED else None
+        await self.backend.publish(channel, data)
+        if started is not None:
+            metrics.broadcast_publish.observe(time.perf_counter() - started)
+
+    async def subscribe(self, channel: str, callback: Callable[[Any], Any]):
+        callbacks = self._subscribers.setdefault(channel, [])
+        callbacks.append(callback)
+        if len(callbacks) == 1:
+            await self.backend.subscribe(channel)
+
+    async def unsubscribe(self, channel: str, callback: Callable[[Any], Any]):
+        callbacks = self._subscribers.get(channel, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                await self.backend.unsubscribe(channel)
+
+    async def next_seq(self, key: str) -> int:
+        """Allocate the next sequence number for a topic key (e.g. a poll id)."""
+        return await self.backend.next_seq(key)
+
+    async def current_seq(self, key: str) -> int:
+        return await self.backend.current_seq(key)
+
+    async def _dispatch(self, channel: str, data: str):
+        started = time.perf_counter() if metrics.ENABLED else None
+        for cb in list(self._subscribers.get(channel, [])):
+            try:
+                if asyncio.iscoroutinefunction(cb):
+                    await cb(data)
+                else:
+                    cb(data)
+            except Exception:
+                logger.exception("broadcast subscriber failed on %s", channel)
+        if started is not None:
+            metrics.broadcast_dispatch.observe(time.perf_counter() - started)
+
+
+def create_backend() -> BroadcastBackend:
+    if settings.BROADCAST_BACKEND == "memory":
+        return MemoryBackend()
+    return RedisBackend(
+        url=settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        publish_batch=settings.BROADCAST_PUBLISH_BATCH,
+        publish_queue_size=settings.BROADCAST_PUBLISH_QUEUE_SIZE,
+        reconnect_max_seconds=settings.BROADCAST_RECONNECT_MAX_SECONDS,
+    )
+
+
+broadcaster = Broadcaster(create_backend())
+
+# module-level shortcuts used by routes and services
+publish = broadcaster.publish
+subscribe = broadcaster.subscribe
+unsubscribe = broadcaster.unsubscribe
+next_seq = broadcaster.next_seq
+current_seq = broadcaster.current_seq
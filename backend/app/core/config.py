@@ -3,20 +3,125 @@ from pydantic import BaseSettings, Field
 class Settings(BaseSettings):
     MONGO_URI: str = Field(...)
     MONGO_DB: str = Field("quickpoll")
+    # connection pool per worker; timeouts in ms (0 = driver default / none)
+    MONGO_MAX_POOL_SIZE: int = Field(100)
+    MONGO_MIN_POOL_SIZE: int = Field(10)
+    MONGO_MAX_IDLE_TIME_MS: int = Field(300000)
+    MONGO_CONNECT_TIMEOUT_MS: int = Field(5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = Field(5000)
+    MONGO_SOCKET_TIMEOUT_MS: int = Field(30000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = Field(2000)
+    # wire compression in preference order, e.g. "zstd,snappy" (needs zstandard / python-snappy)
+    MONGO_COMPRESSORS: str = Field("")
+    # listings and search may be served by secondaries
+    MONGO_LIST_READ_PREFERENCE: str = Field("secondaryPreferred")
+    MONGO_SYNC_INDEXES: bool = Field(True)
     REDIS_URL: str = Field(...)
 
 
     JWT_SECRET: str = Field(...)
     JWT_ALGORITHM: str = Field("HS256")
     JWT_EXP_SECONDS: int = Field(3600)
+    # verified tokens kept in memory (per worker); 0 disables the cache
+    JWT_CACHE_SIZE: int = Field(10000)
 
 
     GOOGLE_CLIENT_ID: str = Field(...)
+    GOOGLE_CERTS_TTL_SECONDS: int = Field(3600)
 
 
     APP_HOST: str = Field("0.0.0.0")
     APP_PORT: int = Field(8000)
     ENV: str = Field("development")
+    # run response_model validation on hot read paths (get_poll); off serves pre-encoded bytes
+    VALIDATE_READ_RESPONSES: bool = Field(False)
+    # Prometheus /metrics, request timing middleware and Mongo command monitoring
+    METRICS_ENABLED: bool = Field(True)
+
+
+    # Vote counters are coalesced in memory and flushed with bulk_write
+    VOTE_WRITE_BEHIND: bool = Field(True)
+    VOTE_FLUSH_INTERVAL_MS: int = Field(50)
+    VOTE_FLUSH_MAX_PENDING: int = Field(1000)
+    VOTE_BATCH_MAX_ITEMS: int = Field(5000)
+
+
+    # Per-socket outbound queue; once full, a client's poll events collapse into one
+    # pending snapshot per poll, and it is disconnected past WS_MAX_STALE_POLLS of those
+    WS_SEND_QUEUE_SIZE: int = Field(256)
+    WS_MAX_STALE_POLLS: int = Field(1000)
+    WS_SEND_TIMEOUT_SECONDS: float = Field(5.0)
+    # app-level pings; sockets that send no message for WS_IDLE_TIMEOUT_SECONDS are
+    # closed (0 disables). Off by default: only clients that answer pings with
+    # {"action": "pong"} count as active, protocol-level pongs never reach the app
+    WS_HEARTBEAT_SECONDS: float = Field(25.0)
+    WS_IDLE_TIMEOUT_SECONDS: float = Field(0.0)
+    # Server-level websocket options (dead-peer detection via protocol pings,
+    # permessage-deflate). Applied only by `python -m app.main`; when starting
+    # `uvicorn app.main:app` directly pass --ws-ping-interval, --ws-ping-timeout
+    # and --ws-per-message-deflate instead
+    WS_PING_INTERVAL_SECONDS: float = Field(20.0)
+    WS_PING_TIMEOUT_SECONDS: float = Field(20.0)
+    WS_PER_MESSAGE_DEFLATE: bool = Field(True)
+    # at most one likes_changed event per poll per interval
+    LIKES_BROADCAST_INTERVAL_MS: int = Field(250)
+
+
+    # "redis" shares events across workers; "memory" keeps them in-process (tests, single worker)
+    BROADCAST_BACKEND: str = Field("redis")
+    REDIS_MAX_CONNECTIONS: int = Field(20)
+    BROADCAST_PUBLISH_BATCH: int = Field(100)
+    BROADCAST_PUBLISH_QUEUE_SIZE: int = Field(10000)
+    BROADCAST_RECONNECT_MAX_SECONDS: float = Field(30.0)
+
+
+    # Poll snapshot cache (per worker); POLL_CACHE_MAX_BYTES=0 disables it
+    POLL_CACHE_MAX_BYTES: int = Field(64 * 1024 * 1024)
+    POLL_CACHE_TTL_SECONDS: float = Field(60.0)
+    POLL_CACHE_LIST_TTL_SECONDS: float = Field(5.0)
+    POLL_CACHE_MAX_LISTS: int = Field(1000)
+
+
+    # Trending feed: score halves every TRENDING_HALF_LIFE_SECONDS without new activity
+    TRENDING_HALF_LIFE_SECONDS: float = Field(6 * 3600)
+    TRENDING_TOP_SIZE: int = Field(100)
+    TRENDING_REFRESH_SECONDS: float = Field(1.0)
+    TRENDING_SNAPSHOT_SECONDS: float = Field(60.0)
+
+
+    # poll_stats bucket increments are upserted in batches
+    ANALYTICS_FLUSH_SECONDS: float = Field(5.0)
+
+
+    # rows fetched per cursor batch (and per streamed chunk) by /polls/{id}/export
+    EXPORT_BATCH_SIZE: int = Field(5000)
+
+
+    # reconciliation worker (app/workers/listener.py); settle must exceed VOTE_FLUSH_INTERVAL_MS
+    RECONCILE_SETTLE_SECONDS: float = Field(5.0)
+    RECONCILE_INTERVAL_SECONDS: float = Field(2.0)
+    RECONCILE_BATCH_SIZE: int = Field(200)
+
+
+    # token buckets on vote/like endpoints: sustained requests per second and burst size
+    RATE_LIMIT_ENABLED: bool = Field(True)
+    # "memory" (per worker) or "redis" (shared; falls back to memory if Redis is down)
+    RATE_LIMIT_BACKEND: str = Field("memory")
+    RATE_LIMIT_USER_RATE: float = Field(2.0)
+    RATE_LIMIT_USER_BURST: float = Field(10)
+    RATE_LIMIT_IP_RATE: float = Field(20.0)
+    RATE_LIMIT_IP_BURST: float = Field(100)
+    RATE_LIMIT_POLL_RATE: float = Field(2000.0)
+    RATE_LIMIT_POLL_BURST: float = Field(5000)
+    RATE_LIMIT_SWEEP_SECONDS: float = Field(60.0)
+    # key IPs on the first X-Forwarded-For entry (only behind a trusted proxy)
+    RATE_LIMIT_TRUST_FORWARDED: bool = Field(False)
+
+
+    # poll expiry scheduler: deadlines within the horizon are held in memory
+    EXPIRY_SWEEP_SECONDS: float = Field(30.0)
+    EXPIRY_HORIZON_SECONDS: float = Field(300.0)
+    ARCHIVE_BATCH_SIZE: int = Field(1000)
 
 
     class Config:
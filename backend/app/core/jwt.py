@@ -1,5 +1,8 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from jose import jwt
 from app.core.config import settings
 
@@ -16,4 +19,68 @@ def create_access_token(subject: str, extra: Dict[str, Any] = None) -> str:
 
 def decode_token(token: str) -> Dict[str, Any]:
     payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-    return payload
\ No newline at end of file
+    return payload
+
+
+class TokenCache:
+    """
+    Bounded LRU of already-verified tokens, keyed by a SHA-256 digest of the
+    token so raw tokens are never kept in memory. Entries expire with the
+    token's own `exp` claim.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        if self.max_entries <= 0:
+            return
+        exp = payload.get("exp")
+        if exp is None:
+            # tokens without exp are always re-verified
+            return
+        key = hashlib.sha256(token.encode()).digest()
+        self._entries[key] = (payload, float(exp))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache(settings.JWT_CACHE_SIZE)
+
+
+def verify_token(token: str) -> Dict[str, Any]:
+    """decode_token with a cache in front; raises JWTError like decode_token."""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_token(token)
+        token_cache.put(token, payload)
+    return payload
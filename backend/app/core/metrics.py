@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+
+# checked by instrumented code before it reads the clock, so a disabled build
+# pays one attribute lookup per call site
+ENABLED = settings.METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, value: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labels, k)} {_number(v)}" for k, v in list(self._values.items())]
+
+
+class Gauge(Metric):
+    """A gauge read at scrape time from `collect()`, which returns {label values: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[Labels, float]], labels: Labels = ()):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labels, k)} {_number(v)}" for k, v in self.collect().items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Labels = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        lines = []
+        for key, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self.metrics) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Histogram(
+    "quickpoll_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"),
+))
+mongo_commands = registry.register(Histogram(
+    "quickpoll_mongo_command_duration_seconds", "MongoDB command round trips by collection and command.", ("collection", "command"),
+))
+mongo_failures = registry.register(Counter(
+    "quickpoll_mongo_command_failures_total", "Failed MongoDB commands by collection and command.", ("collection", "command"),
+))
+broadcast_publish = registry.register(Histogram(
+    "quickpoll_broadcast_publish_seconds", "Time to hand an event to the broadcast backend.",
+))
+broadcast_dispatch = registry.register(Histogram(
+    "quickpoll_broadcast_dispatch_seconds", "Time to run local subscribers (hub fan-out included) for one event.",
+))
+ws_dropped = registry.register(Counter(
+    "quickpoll_ws_dropped_clients_total", "Websocket clients disconnected because their send queue filled.",
+))
+ws_coalesced = registry.register(Counter(
+    "quickpoll_ws_coalesced_events_total", "Poll events replaced by a pending snapshot for a lagging websocket client.",
+))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Times every command the driver sends. Started events carry the collection
+    name; it is kept by request id until the matching succeeded/failed event.
+    Callbacks run on the driver's thread, hence the lock.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "-")
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        with self._lock:
+            mongo_commands.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        with self._lock:
+            mongo_commands.observe(event.duration_micros / 1e6, collection, event.command_name)
+            mongo_failures.inc(collection, event.command_name)
+
+
+def event_listeners() -> list:
+    """Listeners for the Mongo client; none when metrics are off."""
+    return [MongoCommandListener()] if ENABLED else []
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering) observing
+    HTTP latency per route template, so /polls/{poll_id} is one series
+    rather than one per poll.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests.observe(time.perf_counter() - started, scope["method"], _route_template(scope), str(status))
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # the router copies the matched endpoint into our scope; map it back to its template
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        template = _templates(app).get(endpoint)
+        if template:
+            return template
+    return "<unmatched>"
+
+
+_template_cache: Dict[int, Dict[Callable, str]] = {}
+
+
+def _templates(app) -> Dict[Callable, str]:
+    templates = _template_cache.get(id(app))
+    if templates is None:
+        templates = {getattr(r, "endpoint", None): r.path for r in app.routes if hasattr(r, "path")}
+        _template_cache[id(app)] = templates
+    return templates
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Limit(NamedTuple):
+    rate: float   # tokens refilled per second
+    burst: float  # bucket capacity
+
+
+# (bucket key, limit) pairs checked together for one request
+Checks = List[Tuple[str, Limit]]
+
+
+class MemoryBuckets:
+    """
+    Token buckets held in one dict per worker: key -> (tokens, updated_at,
+    full_at). A bucket that has refilled completely carries no information,
+    so the periodic sweep drops every bucket past its full_at; memory stays
+    proportional to recently active callers.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    def acquire(self, checks: Checks, cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens from every bucket, or from none of them. Returns 0.0
+        when allowed, else the seconds until the request would be.
+        """
+        now = time.monotonic()
+        levels = []
+        wait = 0.0
+        for key, limit in checks:
+            bucket = self._buckets.get(key)
+            tokens = limit.burst if bucket is None else min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            levels.append(tokens)
+            if tokens < cost:
+                wait = max(wait, (cost - tokens) / limit.rate)
+        if wait:
+            return wait
+        for (key, limit), tokens in zip(checks, levels):
+            tokens -= cost
+            self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+        return 0.0
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        full = [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]
+        for key in full:
+            del self._buckets[key]
+        return len(full)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# All-or-nothing acquire over KEYS, with ARGV = cost followed by (rate, burst)
+# per key. Uses the server clock so every worker agrees on refill time.
+ACQUIRE_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  local b = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = burst
+  if b[1] then
+    tokens = math.min(burst, tonumber(b[1]) + (now - tonumber(b[2])) * rate)
+  end
+  levels[i] = tokens
+  if tokens < cost then
+    wait = math.max(wait, (cost - tokens) / rate)
+  end
+end
+if wait > 0 then
+  return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  local tokens = levels[i] - cost
+  redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil((burst - tokens) / rate * 1000) + 1000)
+end
+return '0'
+"""
+
+
+class RedisBuckets:
+    """Buckets shared by every worker; one script round trip per request."""
+
+    def __init__(self, url: str, prefix: str = "quickpoll:rl:"):
+        self.url = url
+        self.prefix = prefix
+        self._redis = None
+        self._script = None
+
+    async def connect(self):
+        import redis.asyncio as redis
+
+        self._redis = redis.Redis.from_url(self.url, decode_responses=True)
+        self._script = self._redis.register_script(ACQUIRE_SCRIPT)
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def acquire(self, checks: Checks, cost: float = 1.0) -> float:
+        keys = [self.prefix + key for key, _ in checks]
+        args = [cost]
+        for _, limit in checks:
+            args.extend((limit.rate, limit.burst))
+        return float(await self._script(keys=keys, args=args))
+
+
+class RateLimiter:
+    """
+    Front door for the vote/like endpoints. Checks run in memory (or with a
+    single Redis call) before any MongoDB work. If Redis is unreachable the
+    limiter falls back to this worker's own buckets instead of failing open
+    or rejecting everything.
+    """
+
+    def __init__(self, enabled: bool, backend: str, sweep_seconds: float):
+        self.enabled = enabled
+        self.sweep_seconds = sweep_seconds
+        self.local = MemoryBuckets()
+        self.shared = RedisBuckets(settings.REDIS_URL) if backend == "redis" else None
+        self.rejected = 0
+        self._task: asyncio.Task | None = None
+
+    async def acquire(self, checks: Checks, cost: float = 1.0) -> float:
+        if not self.enabled:
+            return 0.0
+        wait = None
+        if self.shared is not None:
+            try:
+                wait = await self.shared.acquire(checks, cost)
+            except Exception as exc:
+                logger.warning("shared rate limit unavailable (%s), using local buckets", exc)
+        if wait is None:
+            wait = self.local.acquire(checks, cost)
+        if wait:
+            self.rejected += 1
+        return wait
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            self.local.sweep()
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        if self.shared is not None:
+            await self.shared.connect()
+        self._task = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.shared is not None:
+            await self.shared.close()
+
+    def stats(self) -> dict:
+        return {"buckets": len(self.local), "rejected": self.rejected}
+
+
+USER_LIMIT = Limit(settings.RATE_LIMIT_USER_RATE, settings.RATE_LIMIT_USER_BURST)
+IP_LIMIT = Limit(settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST)
+POLL_LIMIT = Limit(settings.RATE_LIMIT_POLL_RATE, settings.RATE_LIMIT_POLL_BURST)
+
+rate_limiter = RateLimiter(
+    enabled=settings.RATE_LIMIT_ENABLED,
+    backend=settings.RATE_LIMIT_BACKEND,
+    sweep_seconds=settings.RATE_LIMIT_SWEEP_SECONDS,
+)
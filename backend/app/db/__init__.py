@@ -0,0 +1 @@
+from app.db.client import get_db, get_read_db
@@ -1,13 +1,82 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReadPreference
 from app.core.config import settings
+from app.core.metrics import event_listeners
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
 
 client: AsyncIOMotorClient | None = None
+read_db: AsyncIOMotorDatabase | None = None
+
+def client_options() -> dict:
+    options = {
+        "appname": "quickpoll",
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS or None,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+        "event_listeners": event_listeners(),
+    }
+    if settings.MONGO_COMPRESSORS:
+        # the driver skips compressors whose library (zstandard, python-snappy) is missing
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
 
 def get_client() -> AsyncIOMotorClient:
     global client
     if client is None:
-        client = AsyncIOMotorClient(settings.MONGO_URI)
+        client = AsyncIOMotorClient(settings.MONGO_URI, **client_options())
     return client
 
 def get_db():
-    return get_client()[settings.MONGO_DB]
\ No newline at end of file
+    return get_client()[settings.MONGO_DB]
+
+def get_read_db():
+    """
+    Database handle for reads that tolerate replication lag (listings,
+    search, totals), using MONGO_LIST_READ_PREFERENCE. Anything that must see
+    the caller's own writes keeps using get_db().
+    """
+    global read_db
+    if read_db is None:
+        try:
+            preference = READ_PREFERENCES[settings.MONGO_LIST_READ_PREFERENCE]
+        except KeyError:
+            raise ValueError(f"MONGO_LIST_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}")
+        read_db = get_client().get_database(settings.MONGO_DB, read_preference=preference)
+    return read_db
+
+async def connect():
+    """
+    Open the pool before serving: fail fast if the deployment is unreachable,
+    establish up to MONGO_MIN_POOL_SIZE connections concurrently so the first
+    requests don't pay for handshakes, then sync indexes.
+    """
+    from app.db.indexes import create_indexes
+
+    db_client = get_client()
+    await asyncio.gather(*(db_client.admin.command("ping") for _ in range(max(settings.MONGO_MIN_POOL_SIZE, 1))))
+    get_read_db()
+    if settings.MONGO_SYNC_INDEXES:
+        await create_indexes(get_db())
+
+def close():
+    global client, read_db
+    if client is not None:
+        client.close()
+    client = None
+    read_db = None
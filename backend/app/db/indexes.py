@@ -1,15 +1,97 @@
-# ensure indexes run at startup
-async def create_indexes(db):
-    await db.users.create_index("email", unique=True)
-    await db.users.create_index("google_id", unique=True, sparse=True)
+import logging
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
 
+logger = logging.getLogger(__name__)
 
-    await db.polls.create_index([("owner_id", 1)])
-    await db.polls.create_index([("created_at", -1)])
-    # if options stored as list of dicts with id and text, we might index options.id if needed
+# same key already indexed under another name / with other options
+INDEX_CONFLICT_CODES = (85, 86)
+# existing documents violate a unique index being built
+DUPLICATE_KEY = 11000
 
+# Names match app/models/collections/*.txt so a database initialised from
+# those scripts syncs cleanly.
+INDEXES = {
+    "users": [
+        IndexModel([("email", 1)], unique=True, name="idx_users_email"),
+        IndexModel([("google_id", 1)], unique=True, sparse=True, name="idx_users_google_id"),
+        IndexModel([("last_seen", -1)], name="idx_users_last_seen"),
+    ],
+    "polls": [
+        IndexModel([("owner_id", 1)], name="idx_polls_owner"),
+        IndexModel([("created_at", -1)], name="idx_polls_created_at"),
+        # keyset pagination walks (sort field, _id); see app/utils/pagination.SORT_FIELDS
+        IndexModel([("created_at", -1), ("_id", -1)]),
+        IndexModel([("updated_at", -1), ("_id", -1)]),
+        IndexModel([("owner_id", 1), ("created_at", -1), ("_id", -1)]),
+        # expiry sweeps walk upcoming deadlines in order
+        IndexModel([("expires_at", 1)], name="idx_polls_expires_at"),
+        # only set while a close is in progress; the sweep retries stale ones
+        IndexModel([("closing", 1)], sparse=True),
+        # search: ranked full-text on question, anchored prefix lookups on search_terms
+        IndexModel([("question", "text")], name="idx_polls_question_text"),
+        IndexModel([("search_terms", 1)]),
+        # if options stored as list of dicts with id and text, we might index options.id if needed
+    ],
+    "votes": [
+        # one vote per user per poll; cast/switch/revert upsert against this index
+        # (its poll_id prefix also serves lookups by poll alone)
+        IndexModel([("poll_id", 1), ("user_id", 1)], unique=True, name="uix_votes_poll_user"),
+        # exports stream a poll's votes in _id order
+        IndexModel([("poll_id", 1), ("_id", 1)]),
+        IndexModel([("user_id", 1)], name="idx_votes_user"),
+        # the caller's votes across a page of polls (list_polls include_my_state)
+        IndexModel([("user_id", 1), ("poll_id", 1)], name="idx_votes_user_poll"),
+        # watermark for the reconciliation worker when change streams are unavailable
+        IndexModel([("updated_at", 1)]),
+    ],
+    "likes": [
+        # one like per user per poll; like/unlike are idempotent upserts/deletes
+        IndexModel([("poll_id", 1), ("user_id", 1)], unique=True, name="uix_likes_poll_user"),
+        IndexModel([("user_id", 1)], name="idx_likes_user"),
+        IndexModel([("user_id", 1), ("poll_id", 1)], name="idx_likes_user_poll"),
+    ],
+    # votes of closed polls, moved by the expiry scheduler
+    "votes_archive": [
+        IndexModel([("poll_id", 1), ("user_id", 1)]),
+        IndexModel([("user_id", 1), ("poll_id", 1)]),
+        IndexModel([("poll_id", 1), ("_id", 1)]),
+    ],
+    # time-bucketed vote analytics; minute/hour buckets carry expires_at
+    "poll_stats": [
+        IndexModel([("poll_id", 1), ("unit", 1), ("bucket", 1)], unique=True),
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+}
 
-    await db.votes.create_index([("poll_id", 1)])
-    await db.votes.create_index([("user_id", 1)])
-    await db.likes.create_index([("poll_id", 1)])
-    await db.likes.create_index([("user_id", 1)])
\ No newline at end of file
+
+async def create_indexes(db):
+    """
+    Idempotent index sync, run at startup: one createIndexes round trip per
+    collection (a no-op for indexes that already exist). If a collection's
+    batch hits a conflicting definition, or a unique index that existing
+    documents violate (duplicate (poll_id, user_id) rows written before
+    votes were upserts), its indexes are retried one by one so a single bad
+    index only costs a log line, not the others or the app's startup.
+    """
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as exc:
+            if exc.code not in INDEX_CONFLICT_CODES and exc.code != DUPLICATE_KEY:
+                raise
+            for model in models:
+                try:
+                    await db[collection].create_indexes([model])
+                except OperationFailure as exc:
+                    name = model.document["name"]
+                    if exc.code == DUPLICATE_KEY:
+                        logger.error(
+                            "unique index %s.%s not built, existing documents have duplicate keys; "
+                            "run python -m app.workers.dedupe_pairs and restart: %s", collection, name, exc,
+                        )
+                    elif exc.code in INDEX_CONFLICT_CODES:
+                        logger.warning("index %s.%s conflicts with an existing one: %s", collection, name, exc)
+                    else:
+                        raise
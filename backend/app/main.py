@@ -1,13 +1,109 @@
 from fastapi import FastAPI
-from app.routes import polls, websocket
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.routes import auth, polls, websocket
 from app.core.broadcaster import broadcaster
+from app.services.vote_buffer import vote_buffer
+from app.services.broadcast import hub, likes_throttle
+from app.services.poll_cache import poll_cache
+from app.core.jwt import token_cache
+from app.services.trending import trending
+from app.services.analytics import analytics
+from app.services.expiry import expiry
+from app.core import metrics
+from app.core.config import settings
+from app.db import client as db
+from app.core.ratelimit import rate_limiter
 
-app = FastAPI(title="QuickPoll API", version="1.0")
+app = FastAPI(title="QuickPoll API", version="1.0", default_response_class=ORJSONResponse)
 
 # Routers
+app.include_router(auth.router)
 app.include_router(polls.router)
 app.include_router(websocket.router)
 
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
+    await db.connect()
     await broadcaster.connect()
+    await vote_buffer.start()
+    await hub.start()
+    await poll_cache.start()
+    await trending.start()
+    await analytics.start()
+    await expiry.start()
+    await rate_limiter.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await rate_limiter.stop()
+    await expiry.stop()
+    await likes_throttle.flush()
+    await trending.stop()
+    await poll_cache.stop()
+    await hub.stop()
+    # flush buffered vote counts before the process exits
+    await vote_buffer.stop()
+    await analytics.stop()
+    await broadcaster.disconnect()
+    # last: the flushes above still write to Mongo
+    db.close()
+
+@app.get("/cache/stats", tags=["Ops"])
+async def cache_stats():
+    # hit/miss counters for sizing POLL_CACHE_MAX_BYTES and JWT_CACHE_SIZE (per worker)
+    return {"polls": poll_cache.stats(), "tokens": token_cache.stats()}
+
+
+def _cache_gauges(cache, name: str):
+    # read at scrape time from the cache's own counters
+    for field in ("entries", "hits", "misses"):
+        metrics.registry.register(metrics.Gauge(
+            f"quickpoll_{name}_cache_{field}", f"{name} cache {field} (per worker).", lambda f=field: {(): cache.stats()[f]},
+        ))
+
+
+if metrics.ENABLED:
+    metrics.registry.register(metrics.Gauge(
+        "quickpoll_ws_connections", "Connected websocket clients.", lambda: {(): len(hub.clients)},
+    ))
+    metrics.registry.register(metrics.Gauge(
+        "quickpoll_ws_send_queue_depth", "Messages queued for websocket clients: total and deepest single queue.",
+        lambda: {
+            ("total",): sum(len(c.queue) for c in hub.clients),
+            ("max",): max((len(c.queue) for c in hub.clients), default=0),
+        },
+        labels=("stat",),
+    ))
+    metrics.registry.register(metrics.Gauge(
+        "quickpoll_vote_buffer_pending", "Write-behind state waiting for the next flush: polls and buffered updates.",
+        lambda: {(k,): v for k, v in vote_buffer.stats().items()},
+        labels=("kind",),
+    ))
+    _cache_gauges(poll_cache, "poll")
+    _cache_gauges(token_cache, "token")
+    metrics.registry.register(metrics.Gauge(
+        "quickpoll_rate_limit", "Rate limiter state (per worker): live local buckets and rejected requests.",
+        lambda: {(k,): v for k, v in rate_limiter.stats().items()},
+        labels=("kind",),
+    ))
+
+    @app.get("/metrics", tags=["Ops"], include_in_schema=False)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # protocol-level pings and permessage-deflate are handled by the server itself
+    uvicorn.run(
+        "app.main:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        ws_ping_interval=settings.WS_PING_INTERVAL_SECONDS,
+        ws_ping_timeout=settings.WS_PING_TIMEOUT_SECONDS,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+    )
@@ -1,22 +1,88 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from jose import JWTError
 from app.schemas.auth import GoogleTokenIn, Token
 from app.core.config import settings
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
-from app.core.jwt import create_access_token
+from app.core.jwt import create_access_token, verify_token
 from app.db.client import get_db
 from bson import ObjectId
 from datetime import datetime
+from typing import Optional
+import threading
+import time
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+    """
+    Resolve the caller from the bearer token's claims alone (no MongoDB
+    lookup). Verified tokens are served from the token cache until they expire.
+    """
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        payload = verify_token(credentials.credentials)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token subject")
+    return payload
+
+
+async def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> Optional[dict]:
+    """Like get_current_user for public endpoints: no or invalid token resolves to None."""
+    if credentials is None:
+        return None
+    try:
+        payload = verify_token(credentials.credentials)
+    except JWTError:
+        return None
+    return payload if payload.get("sub") else None
+
+
+class CachingRequest(google_requests.Request):
+    """
+    Google transport that caches successful GET responses (the OAuth2 certs)
+    for GOOGLE_CERTS_TTL_SECONDS, so verifying an id_token doesn't refetch
+    Google's public keys every time.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        super().__init__()
+        self.ttl = ttl_seconds
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", **kwargs):
+        if method != "GET":
+            return super().__call__(url, method=method, **kwargs)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached and cached[1] > now:
+            return cached[0]
+        response = super().__call__(url, method=method, **kwargs)
+        if response.status == 200:
+            with self._lock:
+                self._cache[url] = (response, now + self.ttl)
+        return response
+
+
+google_request = CachingRequest(settings.GOOGLE_CERTS_TTL_SECONDS)
+
 
 @router.post("/google", response_model=Token)
 async def google_login(payload: GoogleTokenIn):
-    # Verify Google ID token sent by client
+    # Verify Google ID token sent by client (blocking I/O + RSA verify, so off the event loop)
     try:
-      idinfo = id_token.verify_oauth2_token(payload.id_token, google_requests.Request(), settings.GOOGLE_CLIENT_ID)
+      idinfo = await run_in_threadpool(id_token.verify_oauth2_token, payload.id_token, google_request, settings.GOOGLE_CLIENT_ID)
     except Exception as e:
       raise HTTPException(status_code=401, detail=str(e))
 
@@ -1,15 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query, Body
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+import asyncio
+import math
 import uuid
 
-from app.db import get_db
-from app.routes.auth import get_current_user
-from app.core.broadcaster import publish, CHANNEL_NAME
-from app.utils.serializers import serialize_poll
+from app.db import get_db, get_read_db
+from app.core.config import settings
+from app.routes.auth import get_current_user, get_optional_user
+from app.services.broadcast import publish_poll_event, likes_throttle
+from app.utils.serializers import serialize_poll, encode_poll, dumps, raw, with_fields, JSONBytesResponse
+from app.services.vote_buffer import vote_buffer
+from app.services.poll_cache import poll_cache
+from app.utils.pagination import validate_sort, keyset_filter, encode_cursor
+from app.utils.text import search_terms, prefix_filter
 
-from app.schemas.poll import PollCreate as PollCreateSchema, PollOut, PollUpdate
+from app.schemas.poll import PollCreate as PollCreateSchema, PollOut, PollUpdate, VoteBatchIn
+from app.services.vote_batch import ingest_votes
+from app.services.trending import trending
+from app.services.analytics import analytics
+from app.services.export import export_stream, CONTENT_TYPES
+from app.services.expiry import expiry, is_closed
+from app.core.ratelimit import rate_limiter, USER_LIMIT, IP_LIMIT, POLL_LIMIT
 
 router = APIRouter(prefix="/polls", tags=["Polls"])
 
@@ -23,65 +39,225 @@ def ensure_objectid(id_str: str):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid id format")
 
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+async def rate_limited(request: Request, user=Depends(get_current_user)):
+    """
+    Token-bucket check for the vote/like endpoints, keyed by user, client IP
+    and (when the path has one) poll id. Runs before the handler, so a
+    rejected request never reaches MongoDB. Resolves to the current user.
+    """
+    checks = [(f"user:{user['sub']}", USER_LIMIT), (f"ip:{client_ip(request)}", IP_LIMIT)]
+    poll_id = request.path_params.get("poll_id")
+    if poll_id:
+        checks.append((f"poll:{poll_id}", POLL_LIMIT))
+    wait = await rate_limiter.acquire(checks)
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": str(math.ceil(wait))})
+    return user
+
 @router.post("/", response_model=PollOut, status_code=status.HTTP_201_CREATED)
 async def create_poll(payload: PollCreateSchema, user=Depends(get_current_user)):
     db = get_db()
 
     owner_id = user["sub"] if user else None
     now = datetime.utcnow()
+    if payload.expires_at is not None and payload.expires_at <= now:
+        raise HTTPException(status_code=400, detail="expires_at must be in the future")
     options = []
     for opt in payload.options:
         options.append({"id": new_option_id(), "text": opt.text, "count": 0})
 
     doc = {
         "question": payload.question,
+        "search_terms": search_terms(payload.question),
         "options": options,
         "likes": 0,
         "owner_id": owner_id,
+        "active": True,
+        "expires_at": payload.expires_at,
         "created_at": now,
         "updated_at": now,
     }
     res = await db.polls.insert_one(doc)
     doc["_id"] = res.inserted_id
-    await publish(CHANNEL_NAME, {"action": "poll_created", "poll": serialize_poll(doc)})
-    return serialize_poll(doc)
+    expiry.schedule(doc["_id"], payload.expires_at)
+    # encode once, reuse for the broadcast and the response body
+    encoded = encode_poll(doc)
+    await publish_poll_event("poll_created", doc["_id"], feed=True, poll=raw(encoded))
+    return JSONBytesResponse(encoded, status_code=status.HTTP_201_CREATED)
 
 @router.get("/", status_code=status.HTTP_200_OK)
 async def list_polls(
-    search: Optional[str] = Query(None),
+    search: Optional[str] = Query(None, max_length=200),
+    search_mode: str = Query("text", regex="^(text|prefix)$", description="text: relevance-ranked words; prefix: autocomplete"),
     owner_id: Optional[str] = Query(None),
     sort_by: Optional[str] = Query("created_at"),
     order: Optional[int] = Query(-1),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Keyset mode: pass an empty cursor for the first page, then next_cursor"),
+    include_total: bool = Query(False, description="Keyset mode only: also return a (cached) total"),
+    include_my_state: bool = Query(False, description="Embed the caller's my_vote and liked in each poll (needs a bearer token)"),
+    user=Depends(get_optional_user),
 ):
-    db = get_db()
+    """
+    Two pagination modes:
+     - page mode (default): page/limit with total and total_pages.
+     - keyset mode (`cursor` given): walks the (sort_by, _id) index from an opaque
+       cursor, so deep pages cost the same as the first one. Totals are only
+       computed when asked for.
+
+    `search` uses the question text index (results ranked by relevance, page
+    mode only) or, with search_mode=prefix, the `search_terms` index for
+    autocomplete-style matching on partial words.
+
+    `include_my_state` adds the caller's vote and like to every poll with two
+    batched queries, instead of one GET /{poll_id}/my-vote per poll.
+    """
+    if include_my_state and user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    # listings tolerate replication lag (pages are cached for seconds anyway)
+    db = get_read_db()
+    sort_by, order = validate_sort(sort_by, order)
     filters = {}
-    if search:
-        filters["question"] = {"$regex": search, "$options": "i"}
+    ranked = False
+    if search and search_mode == "prefix":
+        filters.update(prefix_filter(search))
+    elif search:
+        filters["$text"] = {"$search": search}
+        ranked = True
     if owner_id:
         filters["owner_id"] = owner_id
+    keyset = cursor is not None
+    if ranked and keyset:
+        raise HTTPException(status_code=400, detail="Cursor pagination is not supported for ranked text search")
+
+    # pages are cached as ids only; documents come from the poll cache
+    cache_key = (search, search_mode, owner_id, sort_by, order, cursor if keyset else page, limit)
+    cached = poll_cache.get_list(cache_key)
+    if cached is not None:
+        ids, next_cursor = cached
+    else:
+        next_cursor = None
+        if ranked:
+            score = {"$meta": "textScore"}
+            found = db.polls.find(filters, {"_id": 1, "score": score}).sort([("score", score), ("_id", -1)]).skip((page - 1) * limit).limit(limit)
+        elif keyset:
+            query = {"$and": [filters, keyset_filter(sort_by, order, cursor)]}
+            found = db.polls.find(query, {"_id": 1, sort_by: 1}).sort([(sort_by, order), ("_id", order)]).limit(limit + 1)
+        else:
+            query = filters
+            found = db.polls.find(query, {"_id": 1}).sort([(sort_by, order), ("_id", order)]).skip((page - 1) * limit).limit(limit)
+        rows = [p async for p in found]
+        ids = [p["_id"] for p in rows[:limit]]
+        if keyset and len(rows) > limit:
+            # from the id query's own row: the poll may since have been
+            # deleted or evicted, which must not end the walk early
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last.get(sort_by), last["_id"])
+        poll_cache.set_list(cache_key, ids, next_cursor)
+
+    total = None
+    if not keyset or include_total:
+        total = await count_polls(filters)
+
+    docs = await poll_cache.get_many(ids)
+    page_docs = [docs[str(i)] for i in ids if str(i) in docs]
+    state = await user_state(user["sub"], page_docs) if include_my_state else {}
+    polls = [raw(with_fields(poll_cache.encode(doc), state.get(str(doc["_id"])))) for doc in page_docs]
 
-    skip = (page - 1) * limit
-    total = await db.polls.count_documents(filters)
-    cursor = db.polls.find(filters).sort(sort_by, order).skip(skip).limit(limit)
-    polls = [serialize_poll(p) async for p in cursor]
-    return {
+    if keyset:
+        response = {"limit": limit, "next_cursor": next_cursor, "results": polls}
+        if include_total:
+            response["total"] = total
+        return JSONBytesResponse(dumps(response))
+    return JSONBytesResponse(dumps({
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": (total + limit - 1) // limit,
         "results": polls,
-    }
+    }))
 
-@router.get("/{poll_id}", response_model=PollOut)
-async def get_poll(poll_id: str):
+async def user_state(user_id, polls: List[dict]) -> dict:
+    """
+    The caller's vote and like for each of `polls`, keyed by poll id: one $in
+    query on votes and one on likes, sent together, both served by the
+    (user_id, poll_id) indexes. Closed polls whose vote was archived cost one
+    more query on votes_archive.
+    """
+    if not polls:
+        return {}
     db = get_db()
+    ids = [p["_id"] for p in polls]
+    query = {"user_id": user_id, "poll_id": {"$in": ids}}
+    votes, likes = await asyncio.gather(
+        db.votes.find(query, {"poll_id": 1, "option_id": 1}).to_list(None),
+        db.likes.find(query, {"poll_id": 1}).to_list(None),
+    )
+    voted = {v["poll_id"]: v.get("option_id") for v in votes}
+    archived = [p["_id"] for p in polls if p.get("active") is False and p["_id"] not in voted]
+    if archived:
+        async for v in db.votes_archive.find({"user_id": user_id, "poll_id": {"$in": archived}}, {"poll_id": 1, "option_id": 1}):
+            voted[v["poll_id"]] = v.get("option_id")
+    liked = {like["poll_id"] for like in likes}
+    return {str(pid): {"my_vote": voted.get(pid), "liked": pid in liked} for pid in ids}
+
+async def count_polls(filters: dict) -> int:
+    """Total for a listing; unfiltered totals use collection metadata, filtered ones are cached."""
+    key = repr(sorted(filters.items()))
+    total = poll_cache.get_total(key)
+    if total is None:
+        db = get_read_db()
+        if filters:
+            total = await db.polls.count_documents(filters)
+        else:
+            total = await db.polls.estimated_document_count()
+        poll_cache.set_total(key, total)
+    return total
+
+@router.get("/trending", status_code=status.HTTP_200_OK)
+async def trending_polls(
+    by: str = Query("trending", regex="^(trending|votes)$", description="trending: time-decayed activity; votes: most voted"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Served from the in-memory trending engine; no sort runs over the polls collection."""
+    ids = trending.top(by, limit)
+    docs = await poll_cache.get_many(ensure_objectid(i) for i in ids)
+    results = []
+    for i in ids:
+        if i in docs:
+            poll = serialize_poll(docs[i])
+            poll["score"] = trending.score(i) if by == "trending" else trending.votes.get(i, 0)
+            results.append(poll)
+    return {"by": by, "results": results}
+
+# exclude_unset: `results` stays absent (not null) for open polls, as on the cached path
+@router.get("/{poll_id}", response_model=PollOut, response_model_exclude_unset=True)
+async def get_poll(
+    poll_id: str,
+    include_my_state: bool = Query(False, description="Embed the caller's my_vote and liked (needs a bearer token)"),
+    user=Depends(get_optional_user),
+):
     oid = ensure_objectid(poll_id)
-    doc = await db.polls.find_one({"_id": oid})
+    doc = await poll_cache.get(oid)
     if not doc:
         raise HTTPException(status_code=404, detail="Poll not found")
-    return serialize_poll(doc)
+    if include_my_state:
+        if user is None:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        state = await user_state(user["sub"], [doc])
+        return JSONBytesResponse(with_fields(poll_cache.encode(doc), state[str(oid)]))
+    if settings.VALIDATE_READ_RESPONSES:
+        return serialize_poll(doc)
+    # hot path: cached bytes, no pydantic validation or re-encoding
+    return JSONBytesResponse(poll_cache.encode(doc))
 
 @router.put("/{poll_id}", response_model=PollOut)
 async def update_poll(poll_id: str, payload: PollUpdate, user=Depends(get_current_user)):
@@ -92,17 +268,21 @@ async def update_poll(poll_id: str, payload: PollUpdate, user=Depends(get_curren
     """
     db = get_db()
     oid = ensure_objectid(poll_id)
-    doc = await db.polls.find_one({"_id": oid})
+    doc = await poll_cache.get(oid)
     if not doc:
         raise HTTPException(status_code=404, detail="Poll not found")
     # optional: check owner
     if doc.get("owner_id") and str(doc.get("owner_id")) != str(user["sub"]):
         raise HTTPException(status_code=403, detail="Only owner can update poll")
+    if is_closed(doc):
+        # frozen results and archived votes refer to the current options
+        raise HTTPException(status_code=409, detail="Poll is closed")
 
     update_doc = {}
     now = datetime.utcnow()
     if payload.question is not None:
         update_doc["question"] = payload.question
+        update_doc["search_terms"] = search_terms(payload.question)
     if payload.options is not None:
         # build new options with new ids and zero counts
         new_options = []
@@ -117,41 +297,48 @@ async def update_poll(poll_id: str, payload: PollUpdate, user=Depends(get_curren
     update_doc["updated_at"] = now
     await db.polls.update_one({"_id": oid}, {"$set": update_doc})
     doc = await db.polls.find_one({"_id": oid})
-    await publish(CHANNEL_NAME, {"action": "poll_updated", "poll": serialize_poll(doc)})
-    return serialize_poll(doc)
+    encoded = encode_poll(doc)
+    await publish_poll_event("poll_updated", oid, feed=True, poll=raw(encoded))
+    return JSONBytesResponse(encoded)
 
 @router.delete("/{poll_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_poll(poll_id: str, user=Depends(get_current_user)):
     db = get_db()
     oid = ensure_objectid(poll_id)
-    doc = await db.polls.find_one({"_id": oid})
+    doc = await poll_cache.get(oid)
     if not doc:
         raise HTTPException(status_code=404, detail="Poll not found")
     if doc.get("owner_id") and str(doc.get("owner_id")) != str(user["sub"]):
         raise HTTPException(status_code=403, detail="Only owner can delete poll")
 
     await db.polls.delete_one({"_id": oid})
-    # remove related votes and likes
+    # remove related votes (live and archived), likes and stats buckets
     await db.votes.delete_many({"poll_id": oid})
+    await db.votes_archive.delete_many({"poll_id": oid})
     await db.likes.delete_many({"poll_id": oid})
-    await publish(CHANNEL_NAME, {"action": "poll_deleted", "poll_id": str(oid)})
+    await db.poll_stats.delete_many({"poll_id": oid})
+    await publish_poll_event("poll_deleted", oid, feed=True)
     return
 
 # --- Voting endpoints ---
 
 @router.post("/{poll_id}/vote", status_code=status.HTTP_200_OK)
-async def cast_vote(poll_id: str, option_id: str = Body(..., embed=True), user=Depends(get_current_user)):
+async def cast_vote(poll_id: str, option_id: str = Body(..., embed=True), user=Depends(rate_limited)):
     """
     Cast a vote. Behavior:
      - If user has not voted: insert vote, increment option count.
      - If user previously voted same option: 400 (already voted).
      - If user previously voted different option: switch vote (decrement old option, increment new, update vote doc).
+    The vote doc is written with a single upsert returning the prior vote, so
+    concurrent requests from the same user cannot double-count.
     """
     db = get_db()
     oid = ensure_objectid(poll_id)
-    poll = await db.polls.find_one({"_id": oid})
+    poll = await poll_cache.get(oid)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
+    if is_closed(poll):
+        raise HTTPException(status_code=409, detail="Poll is closed")
 
     # ensure option exists in poll
     option = next((o for o in poll["options"] if o["id"] == option_id), None)
@@ -159,111 +346,197 @@ async def cast_vote(poll_id: str, option_id: str = Body(..., embed=True), user=D
         raise HTTPException(status_code=404, detail="Option not found in poll")
 
     user_id = user["sub"]
-    existing = await db.votes.find_one({"poll_id": oid, "user_id": user_id})
     now = datetime.utcnow()
+    # one atomic upsert on (poll_id, user_id); the prior doc tells us cast vs switch
+    prior = await upsert_vote(db, oid, user_id, option_id, now)
 
-    if existing:
-        if existing.get("option_id") == option_id:
+    if prior:
+        old_option_id = prior.get("option_id")
+        if old_option_id == option_id:
             raise HTTPException(status_code=400, detail="You already voted this option")
-        # switch vote: decrement old option, increment new option, update vote doc
-        old_option_id = existing.get("option_id")
-        # decrement old
-        await db.polls.update_one({"_id": oid, "options.id": old_option_id}, {"$inc": {"options.$.count": -1}})
-        # increment new
-        await db.polls.update_one({"_id": oid, "options.id": option_id}, {"$inc": {"options.$.count": 1}})
-        # update votes collection
-        await db.votes.update_one({"_id": existing["_id"]}, {"$set": {"option_id": option_id, "updated_at": now}})
-        poll = await db.polls.find_one({"_id": oid})
-        await publish(CHANNEL_NAME, {"action": "vote_switched", "poll": serialize_poll(poll), "user_id": str(user_id)})
+        # switch vote: decrement old, increment new in one $inc (coalesced by the vote buffer)
+        deltas = {old_option_id: -1, option_id: 1}
+        await vote_buffer.apply(oid, deltas)
+        analytics.record(oid, "switch", deltas, now)
+        await publish_poll_event("vote_switched", oid, deltas=deltas, user_id=str(user_id))
         return {"message": "Vote switched successfully"}
     else:
-        # create vote doc
-        await db.votes.insert_one({
-            "poll_id": oid,
-            "user_id": user_id,
-            "option_id": option_id,
-            "created_at": now,
-            "updated_at": now
-        })
         # increment option count
-        await db.polls.update_one({"_id": oid, "options.id": option_id}, {"$inc": {"options.$.count": 1}})
-        poll = await db.polls.find_one({"_id": oid})
-        await publish(CHANNEL_NAME, {"action": "vote_cast", "poll": serialize_poll(poll), "user_id": str(user_id)})
+        deltas = {option_id: 1}
+        await vote_buffer.apply(oid, deltas)
+        analytics.record(oid, "cast", deltas, now)
+        await publish_poll_event("vote_cast", oid, deltas=deltas, user_id=str(user_id))
         return {"message": "Vote cast"}
 
+async def upsert_vote(db, oid, user_id, option_id: str, now: datetime):
+    """
+    Set the user's vote on a poll and return the vote document as it was
+    before (None for a first vote). Relies on the unique (poll_id, user_id)
+    index: two concurrent first votes race on the upsert, and the loser
+    retries as an update of the winner's document.
+    """
+    query = {"poll_id": oid, "user_id": user_id}
+    # pipeline update so a same-option re-vote leaves updated_at alone:
+    # updated_at != created_at is how the stats backfill recognises a switch
+    new_option = {"$literal": option_id}
+    update = [{"$set": {
+        "option_id": new_option,
+        "updated_at": {"$cond": [{"$eq": ["$option_id", new_option]}, "$updated_at", now]},
+        "created_at": {"$ifNull": ["$created_at", now]},
+    }}]
+    try:
+        return await db.votes.find_one_and_update(query, update, upsert=True, return_document=ReturnDocument.BEFORE)
+    except DuplicateKeyError:
+        return await db.votes.find_one_and_update(query, update, return_document=ReturnDocument.BEFORE)
+
+@router.post("/votes:batch", status_code=status.HTTP_200_OK)
+async def cast_votes_batch(payload: VoteBatchIn, user=Depends(rate_limited)):
+    """
+    Replay votes queued offline (kiosks, mobile). Each record is validated
+    against the poll's option ids, duplicates within the batch collapse to the
+    last one, and results come back per item in input order:
+    cast | switched | unchanged | superseded | invalid_poll | invalid_option | closed | forbidden | conflict.
+    One realtime event is emitted per affected poll.
+    """
+    if len(payload.votes) > settings.VOTE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.VOTE_BATCH_MAX_ITEMS} votes per batch")
+    return await ingest_votes(payload.votes, user)
+
 @router.delete("/{poll_id}/vote", status_code=status.HTTP_200_OK)
-async def revert_vote(poll_id: str, user=Depends(get_current_user)):
+async def revert_vote(poll_id: str, user=Depends(rate_limited)):
     """
     Revert (remove) an existing vote by the current user on the poll:
-     - Find vote, decrement the option's count, delete vote document.
+     - Atomically delete the vote document, then decrement the option's count.
     """
     db = get_db()
     oid = ensure_objectid(poll_id)
-    poll = await db.polls.find_one({"_id": oid})
+    poll = await poll_cache.get(oid)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
+    if is_closed(poll):
+        raise HTTPException(status_code=409, detail="Poll is closed")
 
     user_id = user["sub"]
-    existing = await db.votes.find_one({"poll_id": oid, "user_id": user_id})
+    # delete vote record; the deleted doc tells us which option to decrement
+    existing = await db.votes.find_one_and_delete({"poll_id": oid, "user_id": user_id})
     if not existing:
         raise HTTPException(status_code=400, detail="No existing vote to revert")
 
     option_id = existing.get("option_id")
+    now = datetime.utcnow()
     # decrement option count
-    await db.polls.update_one({"_id": oid, "options.id": option_id}, {"$inc": {"options.$.count": -1}})
-    # delete vote record
-    await db.votes.delete_one({"_id": existing["_id"]})
-    poll = await db.polls.find_one({"_id": oid})
-    await publish(CHANNEL_NAME, {"action": "vote_reverted", "poll": serialize_poll(poll), "user_id": str(user_id)})
+    deltas = {option_id: -1}
+    await vote_buffer.apply(oid, deltas)
+    analytics.record(oid, "revert", deltas, now)
+    await publish_poll_event("vote_reverted", oid, deltas=deltas, user_id=str(user_id))
     return {"message": "Vote reverted"}
 
 # --- Likes endpoints (explicit) ---
 
 @router.post("/{poll_id}/like", status_code=status.HTTP_200_OK)
-async def like_poll(poll_id: str, user=Depends(get_current_user)):
+async def like_poll(poll_id: str, user=Depends(rate_limited)):
     """
-    Like a poll. If already liked -> 400 (use /unlike to remove) or you can implement toggle.
+    Like a poll. Idempotent: liking an already-liked poll is a no-op.
+    The like doc is an upsert on the unique (poll_id, user_id) index; the
+    counter update and the realtime event are coalesced per poll.
     """
     db = get_db()
     oid = ensure_objectid(poll_id)
-    poll = await db.polls.find_one({"_id": oid})
+    poll = await poll_cache.get(oid)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     user_id = user["sub"]
-    existing = await db.likes.find_one({"poll_id": oid, "user_id": user_id})
-    if existing:
-        raise HTTPException(status_code=400, detail="Already liked")
     now = datetime.utcnow()
-    await db.likes.insert_one({"poll_id": oid, "user_id": user_id, "created_at": now})
-    await db.polls.update_one({"_id": oid}, {"$inc": {"likes": 1}})
-    poll = await db.polls.find_one({"_id": oid})
-    await publish(CHANNEL_NAME, {"action": "liked", "poll": serialize_poll(poll), "user_id": str(user_id)})
-    return {"message": "Poll liked"}
+    try:
+        res = await db.likes.update_one(
+            {"poll_id": oid, "user_id": user_id},
+            {"$setOnInsert": {"created_at": now}},
+            upsert=True,
+        )
+        created = res.upserted_id is not None
+    except DuplicateKeyError:
+        created = False
+    if created:
+        await vote_buffer.apply_likes(oid, 1)
+        await likes_throttle.add(oid, 1)
+    return {"message": "Poll liked", "liked": True}
 
 @router.delete("/{poll_id}/like", status_code=status.HTTP_200_OK)
-async def unlike_poll(poll_id: str, user=Depends(get_current_user)):
+async def unlike_poll(poll_id: str, user=Depends(rate_limited)):
+    """Remove the user's like. Idempotent: unliking a poll that isn't liked is a no-op."""
     db = get_db()
     oid = ensure_objectid(poll_id)
-    poll = await db.polls.find_one({"_id": oid})
+    poll = await poll_cache.get(oid)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     user_id = user["sub"]
-    existing = await db.likes.find_one({"poll_id": oid, "user_id": user_id})
-    if not existing:
-        raise HTTPException(status_code=400, detail="You have not liked this poll")
-    await db.likes.delete_one({"_id": existing["_id"]})
-    await db.polls.update_one({"_id": oid}, {"$inc": {"likes": -1}})
-    poll = await db.polls.find_one({"_id": oid})
-    await publish(CHANNEL_NAME, {"action": "unliked", "poll": serialize_poll(poll), "user_id": str(user_id)})
-    return {"message": "Poll unliked"}
+    res = await db.likes.delete_one({"poll_id": oid, "user_id": user_id})
+    if res.deleted_count:
+        await vote_buffer.apply_likes(oid, -1)
+        await likes_throttle.add(oid, -1)
+    return {"message": "Poll unliked", "liked": False}
 
 # --- utility endpoints ---
 
+@router.get("/{poll_id}/stats")
+async def poll_stats(
+    poll_id: str,
+    unit: str = Query("minute", regex="^(minute|hour|day)$"),
+    window: int = Query(60, ge=1, le=1440),
+):
+    """
+    Vote-over-time histogram (last `window` buckets of `unit`, net per-option
+    deltas plus cast/switch/revert counts) and lifetime switch/revert rates.
+    Served from pre-aggregated buckets, independent of the number of votes.
+    """
+    oid = ensure_objectid(poll_id)
+    if not await poll_cache.get(oid):
+        raise HTTPException(status_code=404, detail="Poll not found")
+    stats = await analytics.stats(oid, unit, window)
+    return {"poll_id": poll_id, **stats}
+
+@router.get("/{poll_id}/export")
+async def export_poll(
+    poll_id: str,
+    kind: str = Query("votes", regex="^(votes|results)$"),
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    after: Optional[str] = Query(None, description="Resume after this vote_id"),
+    gzip: bool = Query(False),
+    user=Depends(get_current_user),
+):
+    """
+    Stream raw votes (or option results) as CSV/NDJSON straight from a Mongo
+    cursor; nothing is materialised, so memory is constant in poll size.
+    Owner only.
+    """
+    oid = ensure_objectid(poll_id)
+    poll = await poll_cache.get(oid)
+    if not poll:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    if poll.get("owner_id") and str(poll.get("owner_id")) != str(user["sub"]):
+        raise HTTPException(status_code=403, detail="Only owner can export poll")
+    after_oid = ensure_objectid(after) if after else None
+
+    filename = f"poll-{poll_id}-{kind}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_stream(poll, kind, format, after_oid, gzip),
+        media_type=CONTENT_TYPES[format],
+        headers=headers,
+    )
+
 @router.get("/{poll_id}/my-vote")
 async def my_vote(poll_id: str, user=Depends(get_current_user)):
     db = get_db()
     oid = ensure_objectid(poll_id)
     vote = await db.votes.find_one({"poll_id": oid, "user_id": user["sub"]})
+    if not vote:
+        # votes of closed polls live in the archive
+        poll = await poll_cache.get(oid)
+        if poll and poll.get("active") is False:
+            vote = await db.votes_archive.find_one({"poll_id": oid, "user_id": user["sub"]})
     if not vote:
         return {"voted": False}
     return {"voted": True, "option_id": vote.get("option_id")}
@@ -1,47 +1,74 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import asyncio
-import json
-from app.core.broadcaster import broadcaster, CHANNEL_NAME
+from typing import Optional
+from bson import ObjectId
+from app.core.config import settings
+from app.services.broadcast import hub, snapshot_message, supported_encodings, FEED_TOPIC
+from app.utils.serializers import dumps, loads
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
-connected_clients = set()
-
 @router.websocket("/polls")
-async def polls_ws(websocket: WebSocket):
-    await websocket.accept()
-    connected_clients.add(websocket)
+async def polls_ws(websocket: WebSocket, topics: Optional[str] = None, encoding: str = "json"):
+    """
+    Realtime poll events. Clients pick topics with `?topics=feed,poll:<id>`
+    (default: feed) and can change them over the socket:
+      {"action": "subscribe", "topics": ["poll:<id>"]}
+      {"action": "unsubscribe", "topics": ["poll:<id>"]}
+      {"action": "snapshot", "poll_id": "<id>"}  -> full poll plus its current seq
+      {"action": "pong"}                          -> answer to server pings
 
-    pubsub = await broadcaster.subscribe(CHANNEL_NAME)
+    `?encoding=msgpack` asks for binary msgpack frames instead of JSON text;
+    the first message ("hello", always JSON) says which encoding was granted.
+    The server sends {"action": "ping"} every WS_HEARTBEAT_SECONDS. Dead peers
+    are detected by the server's protocol-level pings; only if
+    WS_IDLE_TIMEOUT_SECONDS is set are sockets that send nothing (not even a
+    pong) for that long closed. A client that falls behind may receive a
+    snapshot in place of a poll's queued events.
+    """
+    await websocket.accept()
+    if encoding not in supported_encodings():
+        encoding = "json"
+    await websocket.send_text(dumps({
+        "action": "hello",
+        "encoding": encoding,
+        "heartbeat_seconds": settings.WS_HEARTBEAT_SECONDS,
+        "idle_timeout_seconds": settings.WS_IDLE_TIMEOUT_SECONDS,
+    }).decode())
+    initial = [t for t in topics.split(",") if t] if topics else [FEED_TOPIC]
+    # events are fanned out by the process-wide hub, one upstream subscription per worker
+    client = hub.register(websocket, initial, encoding)
 
     try:
-        async def reader():
-            async for msg in pubsub.listen():
-                if msg["type"] == "message":
-                    data = json.loads(msg["data"])
-                    # Send to all connected clients
-                    await broadcast_to_all(data)
-
-        reader_task = asyncio.create_task(reader())
-
         # Keep connection open
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            hub.touch(client)
+            try:
+                msg = loads(message.get("text") or message.get("bytes") or b"")
+            except ValueError:
+                continue
+            if not isinstance(msg, dict):
+                continue
+            action = msg.get("action")
+            if action == "subscribe":
+                hub.subscribe(client, msg.get("topics") or [])
+            elif action == "unsubscribe":
+                hub.unsubscribe(client, msg.get("topics") or [])
+            elif action == "snapshot":
+                await send_snapshot(client, msg.get("poll_id"))
 
     except WebSocketDisconnect:
-        connected_clients.remove(websocket)
-        reader_task.cancel()
+        pass
+    finally:
+        hub.unregister(client)
 
-async def broadcast_to_all(data: dict):
+async def send_snapshot(client, poll_id):
     """
-    Broadcast message to all connected clients.
+    Send the full poll so a client that saw a gap in `seq` can resync;
+    deltas with a higher seq than the snapshot apply on top of it.
     """
-    living_clients = set()
-    for client in connected_clients:
-        try:
-            await client.send_json(data)
-            living_clients.add(client)
-        except Exception:
-            pass
-    connected_clients.clear()
-    connected_clients.update(living_clients)
+    if not poll_id or not ObjectId.is_valid(poll_id):
+        return
+    hub.send(client, await snapshot_message(poll_id))
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, Field, validator
+from typing import List, Optional
+from datetime import datetime, timezone
 
 
 class PollOptionCreate(BaseModel):
@@ -10,11 +11,45 @@ class PollOptionCreate(BaseModel):
 class PollCreate(BaseModel):
     question: str
     options: List[PollOptionCreate]
+    # UTC; the poll is closed and its votes archived at this time
+    expires_at: Optional[datetime] = None
+
+    @validator("expires_at")
+    def expires_at_naive_utc(cls, value):
+        # stored and compared as naive UTC like every other timestamp
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class PollUpdate(BaseModel):
+    question: Optional[str] = None
+    # replaces every option; ids are reassigned and counts reset
+    options: Optional[List[PollOptionCreate]] = None
 
 
 class PollOut(BaseModel):
+    """Mirrors utils.serializers.serialize_poll field for field."""
+
     id: str = Field(..., alias="_id")
-    owner_id: str
+    owner_id: Optional[str]
     question: str
     options: List[dict]
-    likes: int
\ No newline at end of file
+    likes: int
+    active: bool = True
+    expires_at: Optional[datetime]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    # only present once a closed poll's results are frozen
+    results: Optional[dict]
+
+
+class VoteBatchItem(BaseModel):
+    poll_id: str
+    option_id: str
+    # defaults to the caller; other users' votes need a kiosk token
+    user_id: Optional[str] = None
+
+
+class VoteBatchIn(BaseModel):
+    votes: List[VoteBatchItem]
\ No newline at end of file
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.db.client import get_db
+
+logger = logging.getLogger(__name__)
+
+# bucket granularities, their width and how long their documents are kept
+UNITS = {
+    "minute": (timedelta(minutes=1), timedelta(days=2)),
+    "hour": (timedelta(hours=1), timedelta(days=90)),
+    "day": (timedelta(days=1), None),
+}
+# lifetime counters live in a single "all" bucket
+ALL_BUCKET = datetime(1970, 1, 1)
+
+EVENT_FIELDS = {"cast": "casts", "switch": "switches", "revert": "reverts"}
+
+
+def bucket_start(ts: datetime, unit: str) -> datetime:
+    if unit == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if unit == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ALL_BUCKET
+
+
+def _stats_key(poll_id: ObjectId, unit: str, bucket: datetime) -> dict:
+    return {"poll_id": poll_id, "unit": unit, "bucket": bucket}
+
+
+class PollAnalytics:
+    """
+    Incremental, time-bucketed vote statistics per poll.
+
+    Each vote transition increments minute, hour, day and lifetime buckets in
+    `poll_stats` (event counters plus net per-option deltas). Increments are
+    accumulated in memory and upserted in one bulk_write every
+    ANALYTICS_FLUSH_SECONDS, so a hot poll costs one write per bucket per
+    flush. Minute and hour buckets expire via a TTL index on `expires_at`.
+    """
+
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._task: asyncio.Task | None = None
+
+    def record(self, poll_id: ObjectId, event: str, deltas: Dict[str, int], ts: Optional[datetime] = None):
+        """event is one of cast | switch | revert; deltas are the option count changes."""
+        ts = ts or datetime.utcnow()
+        for unit in list(UNITS) + ["all"]:
+            counters = self._pending[(poll_id, unit, bucket_start(ts, unit))]
+            counters[EVENT_FIELDS[event]] += 1
+            for option_id, delta in deltas.items():
+                counters[f"options.{option_id}"] += delta
+
+    def _ops(self, pending) -> list:
+        ops = []
+        for (poll_id, unit, bucket), counters in pending.items():
+            update = {"$inc": dict(counters)}
+            ttl = UNITS.get(unit, (None, None))[1]
+            if ttl is not None:
+                update["$setOnInsert"] = {"expires_at": bucket + ttl}
+            ops.append(UpdateOne(_stats_key(poll_id, unit, bucket), update, upsert=True))
+        return ops
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+        try:
+            await get_db().poll_stats.bulk_write(self._ops(pending), ordered=False)
+        except Exception:
+            logger.exception("analytics flush failed, re-queueing %d buckets", len(pending))
+            for key, counters in pending.items():
+                for field, value in counters.items():
+                    self._pending[key][field] += value
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def stats(self, poll_id: ObjectId, unit: str, window: int) -> dict:
+        """The last `window` buckets of `unit` plus lifetime totals: two indexed reads."""
+        db = get_db()
+        width = UNITS[unit][0]
+        since = bucket_start(datetime.utcnow() - width * (window - 1), unit)
+        cursor = db.poll_stats.find(
+            {"poll_id": poll_id, "unit": unit, "bucket": {"$gte": since}},
+            {"_id": 0, "poll_id": 0, "unit": 0, "expires_at": 0},
+        ).sort("bucket", 1)
+        buckets = [b async for b in cursor]
+        totals = await db.poll_stats.find_one(_stats_key(poll_id, "all", ALL_BUCKET)) or {}
+        casts = totals.get("casts", 0)
+        return {
+            "unit": unit,
+            "buckets": buckets,
+            "totals": {
+                "casts": casts,
+                "switches": totals.get("switches", 0),
+                "reverts": totals.get("reverts", 0),
+                "switch_rate": totals.get("switches", 0) / casts if casts else 0.0,
+                "revert_rate": totals.get("reverts", 0) / casts if casts else 0.0,
+                "options": totals.get("options", {}),
+            },
+        }
+
+    async def backfill(self, poll_id: Optional[ObjectId] = None, batch_size: int = 5000):
+        """
+        Rebuild buckets from `votes` and `votes_archive` (closed polls) in one
+        streaming pass over each.
+
+        Current vote docs only record the first cast (created_at) and the last
+        switch (updated_at), and reverted votes are gone, so rebuilt buckets
+        are a lower bound for switches and have no reverts.
+        """
+        db = get_db()
+        scope = {"poll_id": poll_id} if poll_id else {}
+        await db.poll_stats.delete_many(scope)
+        pending = defaultdict(lambda: defaultdict(int))
+        seen = 0
+        fields = {"poll_id": 1, "option_id": 1, "created_at": 1, "updated_at": 1}
+        for collection in (db.votes, db.votes_archive):
+            async for vote in collection.find(scope, fields, batch_size=batch_size):
+                created = vote.get("created_at") or vote["_id"].generation_time.replace(tzinfo=None)
+                updated = vote.get("updated_at")
+                switched = updated is not None and updated != created
+                for unit in list(UNITS) + ["all"]:
+                    counters = pending[(vote["poll_id"], unit, bucket_start(created, unit))]
+                    counters["casts"] += 1
+                    counters[f"options.{vote['option_id']}"] += 1
+                    if switched:
+                        pending[(vote["poll_id"], unit, bucket_start(updated, unit))]["switches"] += 1
+                seen += 1
+                if len(pending) >= batch_size:
+                    await db.poll_stats.bulk_write(self._ops(pending), ordered=False)
+                    pending.clear()
+        if pending:
+            await db.poll_stats.bulk_write(self._ops(pending), ordered=False)
+        return seen
+
+
+analytics = PollAnalytics(flush_seconds=settings.ANALYTICS_FLUSH_SECONDS)
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Iterable, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import WebSocket
+
+from app.core import metrics
+from app.core.broadcaster import publish, subscribe, unsubscribe, next_seq, current_seq, CHANNEL_NAME
+from app.core.config import settings
+from app.services.poll_cache import poll_cache
+from app.utils.serializers import dumps, loads, raw
+
+logger = logging.getLogger(__name__)
+
+# Poll lifecycle events (created/updated/deleted) go to the feed topic;
+# every event about a poll also goes to that poll's own topic.
+FEED_TOPIC = "feed"
+
+
+def poll_topic(poll_id) -> str:
+    return f"poll:{poll_id}"
+
+
+async def publish_poll_event(action: str, poll_id, feed: bool = False, **fields):
+    """
+    Publish an event about one poll. Events carry a per-poll `seq` so clients
+    can detect gaps and ask for a snapshot.
+    """
+    poll_id = str(poll_id)
+    topics = [poll_topic(poll_id)]
+    if feed:
+        topics.append(FEED_TOPIC)
+    message = {"action": action, "poll_id": poll_id, "seq": await next_seq(poll_id), "topics": topics}
+    message.update(fields)
+    await publish(CHANNEL_NAME, message)
+
+
+class LikesThrottle:
+    """
+    Coalesces likes deltas per poll so a viral poll emits at most one
+    `likes_changed` event per interval: the first like in a window is sent
+    immediately, later ones are summed and sent when the window closes.
+    """
+
+    def __init__(self, interval_ms: int):
+        self.interval = interval_ms / 1000
+        self._pending: dict[str, int] = {}
+        self._windows: dict[str, asyncio.TimerHandle] = {}
+
+    async def add(self, poll_id, delta: int):
+        poll_id = str(poll_id)
+        self._pending[poll_id] = self._pending.get(poll_id, 0) + delta
+        if poll_id not in self._windows:
+            await self._emit(poll_id)
+
+    async def _emit(self, poll_id: str):
+        delta = self._pending.pop(poll_id, 0)
+        if not delta:
+            self._windows.pop(poll_id, None)
+            return
+        loop = asyncio.get_running_loop()
+        self._windows[poll_id] = loop.call_later(self.interval, self._close_window, poll_id)
+        await publish_poll_event("likes_changed", poll_id, likes_delta=delta)
+
+    def _close_window(self, poll_id: str):
+        self._windows.pop(poll_id, None)
+        if self._pending.get(poll_id):
+            asyncio.create_task(self._emit(poll_id))
+
+    async def flush(self):
+        for handle in self._windows.values():
+            handle.cancel()
+        self._windows.clear()
+        pending, self._pending = self._pending, {}
+        for poll_id, delta in pending.items():
+            if delta:
+                await publish_poll_event("likes_changed", poll_id, likes_delta=delta)
+
+
+class Frame:
+    """
+    One outbound message, shared by every recipient. The msgpack encoding is
+    produced at most once, the first time a binary client needs it.
+    """
+
+    __slots__ = ("text", "poll_id", "_binary")
+
+    def __init__(self, text: str, poll_id: Optional[str] = None):
+        self.text = text
+        # set for poll events, which may be coalesced into a snapshot
+        self.poll_id = poll_id
+        self._binary: Optional[bytes] = None
+
+    def binary(self) -> bytes:
+        if self._binary is None:
+            import msgpack
+            self._binary = msgpack.packb(loads(self.text))
+        return self._binary
+
+
+class Client:
+    """A connected socket with its own bounded outbound queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, encoding: str = "json"):
+        self.websocket = websocket
+        self.encoding = encoding
+        self.queue: Deque[Frame] = deque()
+        self.ready = asyncio.Event()
+        # polls whose queued events are superseded by a snapshot due once the queue drains
+        self.stale: set[str] = set()
+        self.topics: set[str] = set()
+        self.last_seen = time.monotonic()
+        self.task: asyncio.Task | None = None
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return ("json",)
+    return ("json", "msgpack")
+
+
+async def snapshot_message(poll_id: str) -> str:
+    """
+    Full poll plus its current seq (or poll_deleted), for clients resyncing
+    after a gap; deltas with a higher seq apply on top of it.
+    """
+    seq = await current_seq(poll_id)
+    poll = await poll_cache.get(ObjectId(poll_id))
+    if not poll:
+        return dumps({"action": "poll_deleted", "poll_id": poll_id, "seq": seq}).decode()
+    return dumps({"action": "snapshot", "poll_id": poll_id, "seq": seq, "poll": raw(poll_cache.encode(poll))}).decode()
+
+
+class Hub:
+    """
+    Process-wide fan-out hub.
+
+    Holds a single upstream subscription on the broadcaster channel and hands
+    every event to the queues of clients subscribed to one of its topics, so
+    one event costs O(subscribers) enqueues instead of one subscription (and
+    one full broadcast) per socket. Events without topics go to everyone.
+
+    A client whose queue is full stops receiving a poll's events and gets
+    that poll's snapshot once it catches up instead, so a slow consumer ends
+    up with the latest state per poll. Clients with too many polls pending
+    like that are disconnected rather than slowing others.
+
+    A single heartbeat task pings every client and, when `idle_timeout` is
+    set, closes the ones that have sent nothing for longer than that.
+    """
+
+    def __init__(self, channel: str, queue_size: int, max_stale: int, send_timeout: float,
+                 heartbeat_seconds: float, idle_timeout: float):
+        self.channel = channel
+        self.queue_size = queue_size
+        self.max_stale = max_stale
+        self.send_timeout = send_timeout
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_timeout = idle_timeout
+        self.clients: set[Client] = set()
+        self.topics: dict[str, set[Client]] = {}
+        self._started = False
+        self._heartbeat_task: asyncio.Task | None = None
+
+    async def start(self):
+        if not self._started:
+            await subscribe(self.channel, self._on_message)
+            self._started = True
+            if self.heartbeat_seconds:
+                self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._started:
+            await unsubscribe(self.channel, self._on_message)
+            self._started = False
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for client in list(self.clients):
+            await self._close(client, code=1001)
+
+    def register(self, websocket: WebSocket, topics: Iterable[str] = (FEED_TOPIC,), encoding: str = "json") -> Client:
+        client = Client(websocket, encoding)
+        client.task = asyncio.create_task(self._sender(client))
+        self.clients.add(client)
+        self.subscribe(client, topics)
+        return client
+
+    def unregister(self, client: Client):
+        self.clients.discard(client)
+        self.unsubscribe(client, list(client.topics))
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def subscribe(self, client: Client, topics: Iterable[str]):
+        for topic in topics:
+            client.topics.add(topic)
+            self.topics.setdefault(topic, set()).add(client)
+
+    def unsubscribe(self, client: Client, topics: Iterable[str]):
+        for topic in topics:
+            client.topics.discard(topic)
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.topics[topic]
+
+    def touch(self, client: Client):
+        """Record inbound traffic (any message, pongs included) for idle detection."""
+        client.last_seen = time.monotonic()
+
+    def send(self, client: Client, data: str):
+        """Queue a message for one client behind any events already queued."""
+        self._enqueue(client, Frame(data))
+
+    def _enqueue(self, client: Client, frame: Frame):
+        if client not in self.clients:
+            return
+        if frame.poll_id is not None and frame.poll_id in client.stale:
+            # a snapshot of this poll is already due
+            return
+        if len(client.queue) >= self.queue_size:
+            if frame.poll_id is None or len(client.stale) >= self.max_stale:
+                logger.info("dropping slow websocket consumer")
+                metrics.ws_dropped.inc()
+                self.clients.discard(client)
+                asyncio.create_task(self._close(client, code=1013))
+                return
+            client.stale.add(frame.poll_id)
+            metrics.ws_coalesced.inc()
+        else:
+            client.queue.append(frame)
+        client.ready.set()
+
+    def _on_message(self, data: str):
+        try:
+            event = loads(data)
+            topics = event.get("topics")
+        except (ValueError, AttributeError):
+            return
+        if topics is None:
+            recipients = list(self.clients)
+        else:
+            recipients = set()
+            for topic in topics:
+                recipients.update(self.topics.get(topic, ()))
+        frame = Frame(data, event.get("poll_id"))
+        for client in recipients:
+            self._enqueue(client, frame)
+
+    async def _next_frame(self, client: Client) -> Frame:
+        while True:
+            while client.queue:
+                frame = client.queue.popleft()
+                if frame.poll_id is None or frame.poll_id not in client.stale:
+                    return frame
+            if client.stale:
+                poll_id = client.stale.pop()
+                return Frame(await snapshot_message(poll_id))
+            client.ready.clear()
+            await client.ready.wait()
+
+    async def _sender(self, client: Client):
+        while True:
+            frame = await self._next_frame(client)
+            try:
+                if client.encoding == "msgpack":
+                    send = client.websocket.send_bytes(frame.binary())
+                else:
+                    send = client.websocket.send_text(frame.text)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+            except Exception:
+                await self._close(client)
+                return
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            now = time.monotonic()
+            ping = Frame(dumps({"action": "ping", "ts": time.time()}).decode())
+            for client in list(self.clients):
+                if self.idle_timeout and now - client.last_seen > self.idle_timeout:
+                    self.clients.discard(client)
+                    asyncio.create_task(self._close(client, code=1001))
+                elif len(client.queue) < self.queue_size:
+                    self._enqueue(client, ping)
+
+    async def _close(self, client: Client, code: int = 1000):
+        self.unregister(client)
+        try:
+            await client.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+likes_throttle = LikesThrottle(settings.LIKES_BROADCAST_INTERVAL_MS)
+
+hub = Hub(
+    channel=CHANNEL_NAME,
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    max_stale=settings.WS_MAX_STALE_POLLS,
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+    heartbeat_seconds=settings.WS_HEARTBEAT_SECONDS,
+    idle_timeout=settings.WS_IDLE_TIMEOUT_SECONDS,
+)
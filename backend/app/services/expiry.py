@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.db.client import get_db
+from app.services.broadcast import publish_poll_event
+
+logger = logging.getLogger(__name__)
+
+# a closed poll still without results after this long is assumed abandoned
+CLOSE_RETRY_AFTER = timedelta(minutes=5)
+
+
+def is_closed(poll: dict, now: Optional[datetime] = None) -> bool:
+    """A poll stops taking votes once closed or past its expires_at, even before the scheduler runs."""
+    if poll.get("active") is False:
+        return True
+    expires_at = poll.get("expires_at")
+    return expires_at is not None and expires_at <= (now or datetime.utcnow())
+
+
+class ExpiryScheduler:
+    """
+    Closes polls at their `expires_at`.
+
+    An index-ordered sweep (expires_at ascending, active polls only) loads
+    the deadlines falling within the next `horizon` into a min-heap; the
+    loop sleeps until the earliest one. Polls created on this worker are
+    pushed straight onto the heap.
+
+    Closing is a conditional update, so when several workers run the
+    scheduler exactly one of them wins and does the follow-up work: move the
+    votes rows to `votes_archive`, freeze a results snapshot recounted from
+    the archive and broadcast a single `poll_closed` event. `closing` marks
+    a close whose follow-up has not finished; the sweep picks up any left
+    behind by a worker that died or failed.
+    """
+
+    def __init__(self, sweep_seconds: float, horizon_seconds: float, archive_batch: int):
+        self.sweep_seconds = sweep_seconds
+        self.horizon = timedelta(seconds=horizon_seconds)
+        self.archive_batch = archive_batch
+        self._heap: List[Tuple[datetime, str]] = []
+        self._scheduled: Dict[str, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, poll_id, expires_at: Optional[datetime]):
+        if expires_at is None or expires_at > datetime.utcnow() + self.horizon:
+            return
+        key = str(poll_id)
+        if self._scheduled.get(key) == expires_at:
+            return
+        self._scheduled[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        self._wakeup.set()
+
+    async def sweep(self):
+        now = datetime.utcnow()
+        until = now + self.horizon
+        cursor = get_db().polls.find(
+            {"expires_at": {"$ne": None, "$lte": until}, "active": {"$ne": False}},
+            {"expires_at": 1},
+        ).sort("expires_at", 1)
+        async for poll in cursor:
+            self.schedule(poll["_id"], poll["expires_at"])
+
+        # closed, but the worker that closed them died or failed before
+        # freezing results; the grace period leaves in-progress closes alone
+        stuck = get_db().polls.find({"closing": {"$lte": now - CLOSE_RETRY_AFTER}})
+        async for poll in stuck:
+            try:
+                await self.finish_close(poll)
+            except Exception:
+                logger.exception("failed to finish closing poll %s", poll["_id"])
+
+    async def close_poll(self, poll_id: ObjectId) -> bool:
+        db = get_db()
+        now = datetime.utcnow()
+        poll = await db.polls.find_one_and_update(
+            {"_id": poll_id, "active": {"$ne": False}, "expires_at": {"$ne": None, "$lte": now}},
+            {"$set": {"active": False, "closed_at": now, "closing": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if poll is None:
+            # already closed by another worker, deleted, or the deadline moved
+            return False
+
+        # let in-flight write-behind flushes land before freezing the counts
+        await asyncio.sleep(settings.VOTE_FLUSH_INTERVAL_MS / 1000 * 2)
+        await self.finish_close(poll)
+        return True
+
+    async def finish_close(self, poll: dict):
+        """
+        Archive the votes of a poll already marked inactive, freeze `results`
+        recounted from the archive, and announce it. Every step is safe to
+        re-run, and `closing` is cleared (together with writing `results`)
+        only once the archive is complete, so the sweep retries any close
+        that was interrupted.
+        """
+        db = get_db()
+        poll_id = poll["_id"]
+        archived = await self.archive_votes(poll_id)
+        results = {o["id"]: 0 for o in poll["options"]}
+        pipeline = [{"$match": {"poll_id": poll_id}}, {"$group": {"_id": "$option_id", "count": {"$sum": 1}}}]
+        async for row in db.votes_archive.aggregate(pipeline):
+            if row["_id"] in results:
+                results[row["_id"]] = row["count"]
+        options = [{**o, "count": results[o["id"]]} for o in poll["options"]]
+        frozen_at = poll.get("closed_at") or datetime.utcnow()
+        await db.polls.update_one(
+            {"_id": poll_id},
+            {
+                "$set": {"options": options, "results": {"counts": results, "total": sum(results.values()), "frozen_at": frozen_at}},
+                "$unset": {"closing": ""},
+            },
+        )
+        logger.info("closed poll %s, archived %d votes", poll_id, archived)
+        await publish_poll_event("poll_closed", poll_id, feed=True, results=results)
+        # a vote that passed its open-poll check just before the close can
+        # insert its row after the first pass; move it too
+        await self.archive_votes(poll_id)
+
+    async def archive_votes(self, poll_id: ObjectId) -> int:
+        """Move the poll's votes to votes_archive in batches; safe to re-run."""
+        db = get_db()
+        moved = 0
+        while True:
+            batch = await db.votes.find({"poll_id": poll_id}).limit(self.archive_batch).to_list(self.archive_batch)
+            if not batch:
+                return moved
+            try:
+                await db.votes_archive.insert_many(batch, ordered=False)
+            except BulkWriteError as exc:
+                # rows copied by an earlier, interrupted run
+                if any(e.get("code") != 11000 for e in exc.details.get("writeErrors", [])):
+                    raise
+            await db.votes.delete_many({"_id": {"$in": [v["_id"] for v in batch]}})
+            moved += len(batch)
+
+    async def _run(self):
+        last_sweep = None
+        while True:
+            now = datetime.utcnow()
+            if last_sweep is None or (now - last_sweep).total_seconds() >= self.sweep_seconds:
+                try:
+                    await self.sweep()
+                except Exception:
+                    logger.exception("expiry sweep failed")
+                last_sweep = now
+
+            while self._heap and self._heap[0][0] <= datetime.utcnow():
+                expires_at, key = heapq.heappop(self._heap)
+                if self._scheduled.get(key) != expires_at:
+                    continue
+                del self._scheduled[key]
+                try:
+                    await self.close_poll(ObjectId(key))
+                except Exception:
+                    logger.exception("failed to close poll %s", key)
+
+            timeout = self.sweep_seconds
+            if self._heap:
+                timeout = min(timeout, max((self._heap[0][0] - datetime.utcnow()).total_seconds(), 0))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+expiry = ExpiryScheduler(
+    sweep_seconds=settings.EXPIRY_SWEEP_SECONDS,
+    horizon_seconds=settings.EXPIRY_HORIZON_SECONDS,
+    archive_batch=settings.ARCHIVE_BATCH_SIZE,
+)
@@ -0,0 +1,80 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Iterable, Optional
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.db.client import get_db
+from app.utils.serializers import dumps
+
+VOTE_FIELDS = ["vote_id", "user_id", "option_id", "option_text", "created_at", "updated_at"]
+RESULT_FIELDS = ["option_id", "option_text", "count"]
+
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _encode(rows: Iterable[dict], fields: list, fmt: str, header: bool) -> bytes:
+    if fmt == "ndjson":
+        return b"".join(dumps(row) + b"\n" for row in rows)
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue().encode()
+
+
+async def _compress(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # wbits=31 -> gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def _vote_chunks(poll: dict, fmt: str, after: Optional[ObjectId]) -> AsyncIterator[bytes]:
+    """
+    Stream the poll's votes in _id order, one encoded chunk per cursor batch,
+    so memory stays bounded by EXPORT_BATCH_SIZE rows whatever the poll size.
+    Rows carry vote_id; pass the last one seen as `after` to resume.
+    """
+    option_text = {o["id"]: o.get("text") for o in poll["options"]}
+    query = {"poll_id": poll["_id"]}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    projection = {"user_id": 1, "option_id": 1, "created_at": 1, "updated_at": 1}
+    # votes of closed polls have been moved to the archive
+    collection = get_db().votes_archive if poll.get("active") is False else get_db().votes
+    cursor = collection.find(query, projection).sort("_id", 1).batch_size(settings.EXPORT_BATCH_SIZE)
+
+    rows = []
+    header = after is None
+    async for vote in cursor:
+        rows.append({
+            "vote_id": str(vote["_id"]),
+            "user_id": str(vote.get("user_id")),
+            "option_id": vote.get("option_id"),
+            "option_text": option_text.get(vote.get("option_id")),
+            "created_at": vote.get("created_at"),
+            "updated_at": vote.get("updated_at"),
+        })
+        if len(rows) >= settings.EXPORT_BATCH_SIZE:
+            yield _encode(rows, VOTE_FIELDS, fmt, header)
+            rows = []
+            header = False
+    if rows or header:
+        yield _encode(rows, VOTE_FIELDS, fmt, header)
+
+
+async def _result_chunks(poll: dict, fmt: str) -> AsyncIterator[bytes]:
+    rows = [{"option_id": o["id"], "option_text": o.get("text"), "count": o.get("count", 0)} for o in poll["options"]]
+    yield _encode(rows, RESULT_FIELDS, fmt, True)
+
+
+def export_stream(poll: dict, kind: str, fmt: str, after: Optional[ObjectId] = None, gzip: bool = False) -> AsyncIterator[bytes]:
+    chunks = _vote_chunks(poll, fmt, after) if kind == "votes" else _result_chunks(poll, fmt)
+    return _compress(chunks) if gzip else chunks
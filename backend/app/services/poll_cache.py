@@ -0,0 +1,211 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.broadcaster import subscribe, unsubscribe, CHANNEL_NAME
+from app.core.config import settings
+from app.db.client import get_db
+from app.services.vote_buffer import vote_buffer
+from app.utils.serializers import encode_poll, loads
+
+logger = logging.getLogger(__name__)
+
+# events that change which polls a listing returns
+LIFECYCLE_ACTIONS = {"poll_created", "poll_updated", "poll_deleted"}
+
+
+def _estimate_size(doc: dict) -> int:
+    """Rough in-memory footprint of a poll document plus its cached JSON encoding, in bytes."""
+    size = 400 + len(doc.get("question") or "")
+    for opt in doc.get("options") or []:
+        size += 150 + len(opt.get("text") or "")
+    return size
+
+
+class PollCache:
+    """
+    Read-through LRU cache of raw poll documents with a TTL, bounded by an
+    estimated byte budget.
+
+    Entries are kept coherent by the broadcaster events every worker already
+    receives: any event about a cached poll evicts it. Counter events are
+    not patched in: another worker's delta may still sit in its unflushed
+    buffer when the event arrives, or (throttled likes) be flushed well
+    before it, so an event says nothing about what a loaded document
+    already contains. Documents loaded from MongoDB get this worker's
+    unflushed vote deltas applied once, so cached docs are never projected
+    again on read.
+
+    Listing pages are cached as ids only (totals separately) and resolved
+    through the poll entries, so their counts stay as fresh as the polls.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, list_ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.list_ttl = list_ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[dict, float, int]]" = OrderedDict()
+        # listing key -> (page ids, keyset cursor for the next page, expires_at)
+        self._lists: Dict[tuple, Tuple[List[ObjectId], Optional[str], float]] = {}
+        self._totals: Dict[str, Tuple[int, float]] = {}
+        # poll id -> encoded public JSON, dropped whenever the doc changes
+        self._encoded: Dict[str, bytes] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def start(self):
+        await subscribe(CHANNEL_NAME, self.on_event)
+
+    async def stop(self):
+        await unsubscribe(CHANNEL_NAME, self.on_event)
+
+    # --- poll documents ---
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        doc, expires_at, _ = entry
+        if expires_at < time.monotonic():
+            self.invalidate(key)
+            return None
+        self._entries.move_to_end(key)
+        return doc
+
+    def _store(self, doc: dict):
+        if self.max_bytes <= 0:
+            return
+        key = str(doc["_id"])
+        self.invalidate(key)
+        size = _estimate_size(doc)
+        self._entries[key] = (doc, time.monotonic() + self.ttl, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            evicted_key, (_, _, evicted) = self._entries.popitem(last=False)
+            self._encoded.pop(evicted_key, None)
+            self._bytes -= evicted
+            self.evictions += 1
+
+    async def get(self, poll_id: ObjectId) -> Optional[dict]:
+        doc = self._lookup(str(poll_id))
+        if doc is not None:
+            self.hits += 1
+            return doc
+        self.misses += 1
+        doc = await get_db().polls.find_one({"_id": poll_id})
+        if doc is None:
+            return None
+        doc = vote_buffer.project(doc, {})
+        self._store(doc)
+        return doc
+
+    async def get_many(self, poll_ids: Iterable[ObjectId]) -> Dict[str, dict]:
+        """Resolve several polls, fetching all misses with a single $in query."""
+        found = {}
+        missing = []
+        for oid in poll_ids:
+            doc = self._lookup(str(oid))
+            if doc is not None:
+                found[str(oid)] = doc
+            else:
+                missing.append(oid)
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            async for doc in get_db().polls.find({"_id": {"$in": missing}}):
+                doc = vote_buffer.project(doc, {})
+                self._store(doc)
+                found[str(doc["_id"])] = doc
+        return found
+
+    def invalidate(self, poll_id):
+        entry = self._entries.pop(str(poll_id), None)
+        self._encoded.pop(str(poll_id), None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def encode(self, doc: dict) -> bytes:
+        """
+        Public JSON for a poll, encoded once per version of a cached doc and
+        reused by HTTP responses and websocket snapshots until it changes.
+        """
+        key = str(doc["_id"])
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not doc:
+            return encode_poll(doc)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = self._encoded[key] = encode_poll(doc)
+        return encoded
+
+    # --- listing pages ---
+
+    def get_list(self, key: tuple) -> Optional[Tuple[List[ObjectId], Optional[str]]]:
+        """(ids, next_cursor) of a cached listing page, or None."""
+        entry = self._lists.get(key)
+        if entry is None or entry[2] < time.monotonic():
+            self._lists.pop(key, None)
+            return None
+        return entry[0], entry[1]
+
+    def set_list(self, key: tuple, ids: List[ObjectId], next_cursor: Optional[str] = None):
+        if self.max_bytes <= 0:
+            return
+        if len(self._lists) >= settings.POLL_CACHE_MAX_LISTS:
+            self._lists.clear()
+        self._lists[key] = (ids, next_cursor, time.monotonic() + self.list_ttl)
+
+    def get_total(self, key: str) -> Optional[int]:
+        entry = self._totals.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            self._totals.pop(key, None)
+            return None
+        return entry[0]
+
+    def set_total(self, key: str, total: int):
+        if self.max_bytes <= 0:
+            return
+        if len(self._totals) >= settings.POLL_CACHE_MAX_LISTS:
+            self._totals.clear()
+        self._totals[key] = (total, time.monotonic() + self.list_ttl)
+
+    # --- coherence ---
+
+    def on_event(self, data: str):
+        try:
+            event = loads(data)
+        except ValueError:
+            return
+        action = event.get("action")
+        poll_id = event.get("poll_id")
+        if action in LIFECYCLE_ACTIONS:
+            self._lists.clear()
+            self._totals.clear()
+        if not poll_id:
+            return
+        self.invalidate(poll_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "list_entries": len(self._lists),
+        }
+
+
+poll_cache = PollCache(
+    max_bytes=settings.POLL_CACHE_MAX_BYTES,
+    ttl_seconds=settings.POLL_CACHE_TTL_SECONDS,
+    list_ttl_seconds=settings.POLL_CACHE_LIST_TTL_SECONDS,
+)
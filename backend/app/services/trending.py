@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from app.core.broadcaster import subscribe, unsubscribe, CHANNEL_NAME
+from app.core.config import settings
+from app.db.client import get_db
+from app.utils.serializers import loads
+
+logger = logging.getLogger(__name__)
+
+LIKE_WEIGHT = 0.5
+SWITCH_WEIGHT = 0.25
+SNAPSHOT_ID = "snapshot"
+# rebase stored scores before 2**exponent gets anywhere near float range
+MAX_EXPONENT = 512
+
+
+class TrendingEngine:
+    """
+    Time-decayed popularity per poll, fed by the realtime events every worker
+    receives.
+
+    Scores use the usual "forward decay" trick: an event at time t adds
+    weight * 2**((t - epoch) / half_life), so older activity is worth
+    exponentially less without ever touching existing scores. Alongside,
+    net vote totals give the "most voted" ranking. The top TRENDING_TOP_SIZE
+    of each ranking are recomputed at most every TRENDING_REFRESH_SECONDS,
+    so GET /polls/trending is a slice of a ready list.
+
+    Decayed scores are snapshotted to the `trending` collection so a
+    restarted worker warms up from it instead of rescanning `votes`. Vote
+    totals are not: they are seeded on every start from the polls' stored
+    option counts, which stay exact across restarts.
+    """
+
+    def __init__(self, half_life_seconds: float, top_size: int, refresh_seconds: float, snapshot_seconds: float):
+        self.half_life = half_life_seconds
+        self.top_size = top_size
+        self.refresh_seconds = refresh_seconds
+        self.snapshot_seconds = snapshot_seconds
+        self.epoch = time.time()
+        self.scores: Dict[str, float] = {}
+        self.votes: Dict[str, int] = {}
+        self._top: Dict[str, List[str]] = {"trending": [], "votes": []}
+        self._top_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    # --- scoring ---
+
+    def _weight(self, now: float) -> float:
+        exponent = (now - self.epoch) / self.half_life
+        if exponent > MAX_EXPONENT:
+            self._rebase(now)
+            exponent = 0.0
+        return 2 ** exponent
+
+    def _rebase(self, now: float):
+        factor = 2 ** (-(now - self.epoch) / self.half_life)
+        self.scores = {pid: s * factor for pid, s in self.scores.items() if s * factor > 1e-9}
+        self.epoch = now
+
+    def record(self, poll_id: str, weight: float = 1.0, votes: int = 0, now: float | None = None):
+        if weight:
+            self.scores[poll_id] = self.scores.get(poll_id, 0.0) + weight * self._weight(now or time.time())
+        if votes:
+            self.votes[poll_id] = self.votes.get(poll_id, 0) + votes
+
+    def remove(self, poll_id: str):
+        self.scores.pop(poll_id, None)
+        self.votes.pop(poll_id, None)
+        self._top_at = 0.0
+
+    def on_event(self, data: str):
+        try:
+            event = loads(data)
+        except ValueError:
+            return
+        poll_id = event.get("poll_id")
+        if not poll_id:
+            return
+        action = event.get("action")
+        if action == "poll_deleted":
+            self.remove(poll_id)
+        elif action in ("vote_cast", "vote_reverted", "votes_batch"):
+            net = sum(event.get("deltas", {}).values())
+            self.record(poll_id, weight=max(net, 0) or SWITCH_WEIGHT, votes=net)
+        elif action == "vote_switched":
+            self.record(poll_id, weight=SWITCH_WEIGHT)
+        elif action == "likes_changed":
+            self.record(poll_id, weight=max(event.get("likes_delta", 0), 0) * LIKE_WEIGHT)
+
+    # --- serving ---
+
+    def top(self, by: str, k: int) -> List[str]:
+        now = time.monotonic()
+        if now - self._top_at >= self.refresh_seconds:
+            self._top = {
+                "trending": [p for p, _ in heapq.nlargest(self.top_size, self.scores.items(), key=lambda i: i[1])],
+                "votes": [p for p, _ in heapq.nlargest(self.top_size, self.votes.items(), key=lambda i: i[1])],
+            }
+            self._top_at = now
+        return self._top[by][:k]
+
+    def score(self, poll_id: str) -> float:
+        """Current decayed score, comparable across polls and over time."""
+        raw = self.scores.get(poll_id, 0.0)
+        return raw * 2 ** (-(time.time() - self.epoch) / self.half_life)
+
+    # --- persistence ---
+
+    def _snapshot_doc(self) -> dict:
+        # decayed scores only matter near the top, which also keeps the
+        # document far below the BSON size limit
+        keep = self.top_size * 50
+        scores: List[Tuple[str, float]] = heapq.nlargest(keep, self.scores.items(), key=lambda i: i[1])
+        return {
+            "_id": SNAPSHOT_ID,
+            "epoch": self.epoch,
+            "half_life": self.half_life,
+            "scores": [[p, s] for p, s in scores],
+            "saved_at": datetime.utcnow(),
+        }
+
+    async def save_snapshot(self):
+        await get_db().trending.replace_one({"_id": SNAPSHOT_ID}, self._snapshot_doc(), upsert=True)
+
+    async def load_snapshot(self):
+        doc = await get_db().trending.find_one({"_id": SNAPSHOT_ID})
+        if not doc:
+            return
+        # re-express saved scores relative to our epoch (and half-life, if it changed)
+        saved_half_life = doc.get("half_life", self.half_life)
+        now = time.time()
+        for poll_id, raw in doc.get("scores", []):
+            current = raw * 2 ** (-(now - doc["epoch"]) / saved_half_life)
+            if current > 0 and not math.isinf(current):
+                self.scores[poll_id] = self.scores.get(poll_id, 0.0) + current * self._weight(now)
+        self._top_at = 0.0
+
+    async def seed_votes(self):
+        """Net vote totals from the polls themselves, in one pass."""
+        pipeline = [{"$project": {"total": {"$sum": "$options.count"}}}, {"$match": {"total": {"$ne": 0}}}]
+        async for doc in get_db().polls.aggregate(pipeline):
+            poll_id = str(doc["_id"])
+            self.votes[poll_id] = self.votes.get(poll_id, 0) + doc["total"]
+        self._top_at = 0.0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_seconds)
+            try:
+                await self.save_snapshot()
+            except Exception:
+                logger.exception("failed to persist trending snapshot")
+
+    async def start(self):
+        try:
+            await self.load_snapshot()
+        except Exception:
+            logger.exception("failed to load trending snapshot, starting cold")
+        try:
+            await self.seed_votes()
+        except Exception:
+            logger.exception("failed to seed vote totals, counting from events only")
+        await subscribe(CHANNEL_NAME, self.on_event)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        await unsubscribe(CHANNEL_NAME, self.on_event)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.save_snapshot()
+        except Exception:
+            logger.exception("failed to persist trending snapshot")
+
+
+trending = TrendingEngine(
+    half_life_seconds=settings.TRENDING_HALF_LIFE_SECONDS,
+    top_size=settings.TRENDING_TOP_SIZE,
+    refresh_seconds=settings.TRENDING_REFRESH_SECONDS,
+    snapshot_seconds=settings.TRENDING_SNAPSHOT_SECONDS,
+)
@@ -0,0 +1,140 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.db.client import get_db
+from app.schemas.poll import VoteBatchItem
+from app.services.analytics import analytics
+from app.services.broadcast import publish_poll_event
+from app.services.expiry import is_closed
+from app.services.poll_cache import poll_cache
+from app.services.vote_buffer import vote_buffer
+
+
+async def ingest_votes(items: List[VoteBatchItem], caller: dict) -> dict:
+    """
+    Apply a batch of offline votes in few round trips: one $in read of the
+    polls (through the poll cache), one read of the existing votes, one
+    unordered bulk_write of first votes, one conditional update per switch
+    (run concurrently) and one $inc per affected poll (buffered or
+    bulk-written). Emits one event per poll.
+
+    Records that lose a race with a concurrent vote by the same user (the
+    pair got inserted, or the vote changed since it was read) are reported
+    as "conflict" and leave counts untouched.
+
+    Within a batch the last record for a (poll, user) pair wins; earlier
+    ones are reported as "superseded". Returns per-item results in input order.
+    """
+    results: List[dict] = [{"index": i} for i in range(len(items))]
+    can_vote_for_others = bool(caller.get("kiosk"))
+
+    poll_ids = {item.poll_id for item in items if ObjectId.is_valid(item.poll_id)}
+    polls = await poll_cache.get_many(ObjectId(p) for p in poll_ids)
+
+    # validate and dedupe; `latest` keeps the index of the winning record per pair
+    latest: Dict[tuple, int] = {}
+    for i, item in enumerate(items):
+        user_id = item.user_id or caller["sub"]
+        poll = polls.get(item.poll_id)
+        if user_id != caller["sub"] and not can_vote_for_others:
+            results[i]["status"] = "forbidden"
+        elif poll is None:
+            results[i]["status"] = "invalid_poll"
+        elif is_closed(poll):
+            results[i]["status"] = "closed"
+        elif not any(o["id"] == item.option_id for o in poll["options"]):
+            results[i]["status"] = "invalid_option"
+        else:
+            key = (item.poll_id, user_id)
+            if key in latest:
+                results[latest[key]]["status"] = "superseded"
+            latest[key] = i
+    if not latest:
+        return {"applied": 0, "results": results}
+
+    db = get_db()
+    existing = {}
+    query = {
+        "poll_id": {"$in": [ObjectId(p) for p, _ in latest]},
+        "user_id": {"$in": list({u for _, u in latest})},
+    }
+    async for vote in db.votes.find(query, {"poll_id": 1, "user_id": 1, "option_id": 1}):
+        existing[(str(vote["poll_id"]), vote["user_id"])] = vote
+
+    now = datetime.utcnow()
+    casts = []
+    cast_items = []
+    switches = []
+    for (poll_id, user_id), i in latest.items():
+        option_id = items[i].option_id
+        prior = existing.get((poll_id, user_id))
+        if prior is None:
+            # insert-only: if a concurrent single vote created the pair first,
+            # the op matches that doc and leaves it alone
+            casts.append(UpdateOne(
+                {"poll_id": ObjectId(poll_id), "user_id": user_id},
+                {"$setOnInsert": {"option_id": option_id, "created_at": now, "updated_at": now}},
+                upsert=True,
+            ))
+            cast_items.append((i, poll_id, option_id))
+        elif prior["option_id"] == option_id:
+            results[i]["status"] = "unchanged"
+        else:
+            switches.append((i, poll_id, prior, option_id))
+
+    # a cast counts only if its op inserted the vote doc
+    inserted = set()
+    if casts:
+        try:
+            result = await db.votes.bulk_write(casts, ordered=False)
+            inserted.update(result.upserted_ids)
+        except BulkWriteError as exc:
+            # e.g. two upserts for the pair raced on the unique index
+            inserted.update(u["index"] for u in exc.details.get("upserted", []))
+
+    # a switch only applies if the vote still holds the option we read; each
+    # needs its own matched/not-matched answer, so they run as separate updates
+    switched = await asyncio.gather(*(
+        db.votes.find_one_and_update(
+            {"_id": prior["_id"], "option_id": prior["option_id"]},
+            {"$set": {"option_id": option_id, "updated_at": now}},
+            projection={"_id": 1},
+        )
+        for _, _, prior, option_id in switches
+    ))
+
+    applied_items = []
+    for op_index, (i, poll_id, option_id) in enumerate(cast_items):
+        if op_index in inserted:
+            results[i]["status"] = "cast"
+            applied_items.append((poll_id, None, option_id))
+        else:
+            results[i]["status"] = "conflict"
+    for (i, poll_id, prior, option_id), matched in zip(switches, switched):
+        if matched is not None:
+            results[i]["status"] = "switched"
+            applied_items.append((poll_id, prior["option_id"], option_id))
+        else:
+            results[i]["status"] = "conflict"
+
+    deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    applied = defaultdict(int)
+    for poll_id, old_option_id, option_id in applied_items:
+        item_deltas = {option_id: 1}
+        if old_option_id:
+            item_deltas[old_option_id] = -1
+        for opt, delta in item_deltas.items():
+            deltas[poll_id][opt] += delta
+        analytics.record(ObjectId(poll_id), "switch" if old_option_id else "cast", item_deltas, now)
+        applied[poll_id] += 1
+
+    await vote_buffer.apply_many({ObjectId(p): dict(d) for p, d in deltas.items()})
+    for poll_id, poll_deltas in deltas.items():
+        await publish_poll_event("votes_batch", poll_id, deltas=dict(poll_deltas), votes=applied[poll_id])
+    return {"applied": sum(applied.values()), "results": results}
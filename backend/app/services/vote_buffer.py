@@ -0,0 +1,206 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ConfigurationError, ServerSelectionTimeoutError
+
+from app.core.config import settings
+from app.db.client import get_db
+
+logger = logging.getLogger(__name__)
+
+
+def _new_pending():
+    return defaultdict(lambda: defaultdict(int))
+
+
+def build_inc_update(poll_id, deltas: Dict[str, int], likes: int = 0):
+    """
+    Build a single `$inc` touching every option in `deltas` via arrayFilters
+    (plus the likes counter), so a vote switch or a whole batch of votes and
+    likes is one write on the poll doc.
+    Returns (filter, update, array_filters) or None if nothing changes.
+    """
+    inc = {}
+    if likes:
+        inc["likes"] = likes
+    array_filters = []
+    for i, (option_id, delta) in enumerate(deltas.items()):
+        if not delta:
+            continue
+        inc[f"options.$[o{i}].count"] = delta
+        array_filter = {f"o{i}.id": option_id}
+        if delta < 0:
+            # never drive a counter below zero
+            array_filter[f"o{i}.count"] = {"$gte": -delta}
+        array_filters.append(array_filter)
+    if not inc:
+        return None
+    query = {"_id": poll_id}
+    if array_filters:
+        # counts of closed polls are frozen from a recount; late deltas must not move them
+        query["active"] = {"$ne": False}
+    return query, {"$inc": inc}, array_filters or None
+
+
+class VoteBuffer:
+    """
+    Write-behind accumulator for poll counters (option counts and likes).
+
+    Vote and like documents are still written synchronously (they carry the
+    per-user dedup guarantee); only the `$inc` on `polls.options.count` and
+    `polls.likes` is coalesced per poll and flushed with one unordered
+    bulk_write every `flush_interval_ms` or as soon as `max_pending` updates
+    are buffered.
+    """
+
+    def __init__(self, enabled: bool, flush_interval_ms: int, max_pending: int):
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._pending = _new_pending()
+        self._pending_likes = defaultdict(int)
+        self._pending_votes = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    async def apply(self, poll_id, deltas: Dict[str, int]):
+        """Record option count deltas for a poll, e.g. {new_id: 1, old_id: -1}."""
+        if not self.enabled:
+            update = build_inc_update(poll_id, deltas)
+            if update:
+                query, doc, array_filters = update
+                await get_db().polls.update_one(query, doc, array_filters=array_filters)
+            return
+        pending = self._pending[poll_id]
+        for option_id, delta in deltas.items():
+            pending[option_id] += delta
+        self._pending_votes += 1
+        if self._pending_votes >= self.max_pending:
+            self._wakeup.set()
+
+    async def apply_many(self, deltas_by_poll: Dict[object, Dict[str, int]]):
+        """Record deltas for several polls; direct mode writes them in one bulk_write."""
+        if self.enabled:
+            for poll_id, deltas in deltas_by_poll.items():
+                await self.apply(poll_id, deltas)
+            return
+        ops = []
+        for poll_id, deltas in deltas_by_poll.items():
+            update = build_inc_update(poll_id, deltas)
+            if update:
+                query, doc, array_filters = update
+                ops.append(UpdateOne(query, doc, array_filters=array_filters))
+        if ops:
+            await get_db().polls.bulk_write(ops, ordered=False)
+
+    async def apply_likes(self, poll_id, delta: int):
+        """Record a likes delta for a poll."""
+        if not self.enabled:
+            await get_db().polls.update_one({"_id": poll_id}, {"$inc": {"likes": delta}})
+            return
+        self._pending_likes[poll_id] += delta
+        self._pending_votes += 1
+        if self._pending_votes >= self.max_pending:
+            self._wakeup.set()
+
+    def pending(self, poll_id) -> Dict[str, int]:
+        return dict(self._pending.get(poll_id, {}))
+
+    def stats(self) -> dict:
+        return {"polls": len(set(self._pending) | set(self._pending_likes)), "updates": self._pending_votes}
+
+    def project(self, poll: dict, deltas: Dict[str, int]) -> dict:
+        """
+        Return `poll` (as read before the vote) with the counts clients should
+        see: this vote's deltas in direct mode, or every not-yet-flushed delta
+        for the poll in write-behind mode (which already includes this vote).
+        """
+        likes = 0
+        if self.enabled:
+            deltas = self.pending(poll["_id"])
+            likes = self._pending_likes.get(poll["_id"], 0)
+        if not deltas and not likes:
+            return poll
+        options = []
+        for opt in poll["options"]:
+            delta = deltas.get(opt["id"])
+            options.append({**opt, "count": opt.get("count", 0) + delta} if delta else opt)
+        return {**poll, "options": options, "likes": poll.get("likes", 0) + likes}
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending and not self._pending_likes:
+                return
+            pending, self._pending = self._pending, _new_pending()
+            pending_likes, self._pending_likes = self._pending_likes, defaultdict(int)
+            self._pending_votes = 0
+
+            ops = []
+            op_polls = []
+            for poll_id in set(pending) | set(pending_likes):
+                update = build_inc_update(poll_id, pending.get(poll_id, {}), pending_likes.get(poll_id, 0))
+                if update:
+                    query, doc, array_filters = update
+                    ops.append(UpdateOne(query, doc, array_filters=array_filters))
+                    op_polls.append(poll_id)
+            if not ops:
+                return
+            try:
+                await get_db().polls.bulk_write(ops, ordered=False)
+            except BulkWriteError as exc:
+                # unordered: every op not listed in writeErrors was applied (a
+                # write concern error means they all were), so only the failed
+                # ones go back in the queue
+                failed = [op_polls[e["index"]] for e in exc.details.get("writeErrors", [])]
+                logger.error("vote buffer flush: %d of %d updates failed, re-queueing them", len(failed), len(ops))
+                self._requeue(failed, pending, pending_likes)
+            except (ServerSelectionTimeoutError, ConfigurationError):
+                # no server was reached, so nothing was written
+                logger.exception("vote buffer flush failed, re-queueing %d updates", len(ops))
+                self._requeue(op_polls, pending, pending_likes)
+            except Exception:
+                # the batch may or may not have landed (e.g. the connection
+                # dropped after the server applied it); retrying could count
+                # twice, so drift is left to the reconciliation worker
+                logger.exception("vote buffer flush outcome unknown, dropping %d updates", len(ops))
+
+    def _requeue(self, poll_ids, pending, pending_likes):
+        for poll_id in poll_ids:
+            for option_id, delta in pending.get(poll_id, {}).items():
+                self._pending[poll_id][option_id] += delta
+            if pending_likes.get(poll_id):
+                self._pending_likes[poll_id] += pending_likes[poll_id]
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+vote_buffer = VoteBuffer(
+    enabled=settings.VOTE_WRITE_BEHIND,
+    flush_interval_ms=settings.VOTE_FLUSH_INTERVAL_MS,
+    max_pending=settings.VOTE_FLUSH_MAX_PENDING,
+)
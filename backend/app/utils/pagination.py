@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+# Sortable fields for GET /polls. Each one is backed by a ({field}, _id)
+# compound index in app/db/indexes.py, so both page and cursor modes walk an
+# index instead of sorting in memory.
+SORT_FIELDS = ("created_at", "updated_at")
+
+
+def validate_sort(sort_by: str, order: int) -> Tuple[str, int]:
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(SORT_FIELDS)}")
+    if order not in (1, -1):
+        raise HTTPException(status_code=400, detail="order must be 1 or -1")
+    return sort_by, order
+
+
+def encode_cursor(sort_value: Any, oid: ObjectId) -> str:
+    """Opaque cursor for the position just after (sort_value, _id)."""
+    if isinstance(sort_value, datetime):
+        value = {"d": sort_value.isoformat()}
+    else:
+        value = {"v": sort_value}
+    raw = json.dumps({**value, "id": str(oid)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value = datetime.fromisoformat(data["d"]) if "d" in data else data["v"]
+        return value, ObjectId(data["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(sort_by: str, order: int, cursor: Optional[str]) -> dict:
+    """Mongo filter selecting documents strictly after `cursor` in (sort_by, _id) order."""
+    if not cursor:
+        return {}
+    value, oid = decode_cursor(cursor)
+    op = "$lt" if order == -1 else "$gt"
+    return {"$or": [{sort_by: {op: value}}, {sort_by: value, "_id": {op: oid}}]}
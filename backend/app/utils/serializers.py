@@ -0,0 +1,69 @@
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+
+
+def _default(obj: Any):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """orjson encoding used for HTTP bodies and broadcast payloads (datetimes as ISO 8601)."""
+    return orjson.dumps(obj, default=_default)
+
+
+def loads(data) -> Any:
+    return orjson.loads(data)
+
+
+# orjson.Fragment arrived in orjson 3.9
+_Fragment = getattr(orjson, "Fragment", None)
+
+
+def raw(encoded: bytes) -> Any:
+    """
+    Embed already-encoded JSON in a larger document without re-encoding it.
+    On orjson < 3.9 the value is decoded and embedded as a plain object.
+    """
+    if _Fragment is None:
+        return orjson.loads(encoded)
+    return _Fragment(encoded)
+
+
+def serialize_poll(doc: dict) -> dict:
+    """Public shape of a poll document (matches schemas.poll.PollOut)."""
+    poll = {
+        "_id": str(doc["_id"]),
+        "owner_id": str(doc["owner_id"]) if doc.get("owner_id") is not None else None,
+        "question": doc.get("question"),
+        "options": [{"id": o["id"], "text": o.get("text"), "count": o.get("count", 0)} for o in doc.get("options", [])],
+        "likes": doc.get("likes", 0),
+        "active": doc.get("active", True),
+        "expires_at": doc.get("expires_at"),
+        "created_at": doc.get("created_at"),
+        "updated_at": doc.get("updated_at"),
+    }
+    if "results" in doc:
+        poll["results"] = doc["results"]
+    return poll
+
+
+def encode_poll(doc: dict) -> bytes:
+    return dumps(serialize_poll(doc))
+
+
+def with_fields(encoded: bytes, fields: dict) -> bytes:
+    """Add `fields` to an encoded (non-empty) JSON object without decoding it."""
+    if not fields:
+        return encoded
+    return encoded[:-1] + b"," + dumps(fields)[1:]
+
+
+class JSONBytesResponse(Response):
+    """Response for bodies that are already JSON-encoded bytes."""
+
+    media_type = "application/json"
@@ -0,0 +1,36 @@
+import re
+from typing import List
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Terms longer than this are truncated; prefix lookups never need more.
+MAX_TERM_LENGTH = 32
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of `text`, in order."""
+    return [w[:MAX_TERM_LENGTH] for w in _WORD_RE.findall((text or "").lower())]
+
+
+def search_terms(text: str) -> List[str]:
+    """
+    Distinct tokens stored on a poll as `search_terms`. The multikey index on
+    that field serves anchored prefix lookups for autocomplete.
+    """
+    return list(dict.fromkeys(tokenize(text)))
+
+
+def prefix_filter(query: str) -> dict:
+    """
+    Autocomplete filter: every complete word must be present and the last
+    (possibly partial) word must prefix a term. The regex is escaped and
+    anchored, so it is an index range scan rather than a collection scan.
+    """
+    words = tokenize(query)
+    if not words:
+        return {}
+    *complete, partial = words
+    clauses = [{"search_terms": {"$regex": "^" + re.escape(partial)}}]
+    if complete:
+        clauses.append({"search_terms": {"$all": complete}})
+    return {"$and": clauses} if len(clauses) > 1 else clauses[0]
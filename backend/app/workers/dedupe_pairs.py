@@ -0,0 +1,45 @@
+"""
+Remove duplicate (poll_id, user_id) rows from votes and likes so the unique
+indexes can be built. Rows like these could be written before votes and
+likes became upserts; the most recently written row of each pair is kept.
+
+    python -m app.workers.dedupe_pairs
+
+Vote counters are not touched; run the reconciliation worker with --all
+afterwards to recount affected polls.
+"""
+import asyncio
+import logging
+import time
+
+from app.db.client import get_db
+
+logger = logging.getLogger(__name__)
+
+
+async def dedupe(collection) -> int:
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": {"poll_id": "$poll_id", "user_id": "$user_id"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]
+    removed = 0
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        # ObjectIds grow with insertion time; keep the newest
+        extra = group["ids"][:-1]
+        result = await collection.delete_many({"_id": {"$in": extra}})
+        removed += result.deleted_count
+    return removed
+
+
+async def main():
+    db = get_db()
+    for name in ("votes", "likes"):
+        started = time.perf_counter()
+        removed = await dedupe(db[name])
+        logger.info("removed %d duplicate %s rows in %.1fs", removed, name, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
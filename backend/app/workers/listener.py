@@ -0,0 +1,207 @@
+"""
+Vote count reconciliation worker.
+
+    python -m app.workers.listener          # follow changes, fix drifted polls
+    python -m app.workers.listener --all    # also check every poll once at startup
+
+Option counters in `polls.options.count` are maintained by increments (and
+reset by option replacement), so they can drift from the `votes`
+collection. This worker tracks which polls changed, waits for them to settle
+(past the API's write-behind flush) and recounts only those polls; a drift
+must show up identically on two passes before it is corrected, and every
+correction is published as a `poll_updated` event.
+
+Changed polls come from a change stream on `polls` (every vote bumps a
+counter there). On deployments without change streams (standalone mongod)
+it falls back to polling `votes.updated_at` past a watermark; that misses
+reverts, which only delete a vote.
+"""
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.core.broadcaster import broadcaster
+from app.core.config import settings
+from app.db.client import get_db
+from app.services.broadcast import publish_poll_event
+from app.utils.serializers import encode_poll, raw
+
+logger = logging.getLogger(__name__)
+
+
+class Reconciler:
+    def __init__(self, settle_seconds: float, interval_seconds: float, batch_size: int):
+        self.settle_seconds = settle_seconds
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        # poll id -> monotonic time of the last change seen
+        self.dirty: Dict[ObjectId, float] = {}
+        # poll id -> (counters, drift) seen on the last pass, awaiting confirmation
+        self.suspects: Dict[ObjectId, tuple] = {}
+
+    def mark(self, poll_ids: Iterable[ObjectId]):
+        now = time.monotonic()
+        for poll_id in poll_ids:
+            self.dirty[poll_id] = now
+
+    async def follow_change_stream(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["update", "replace"]}}}]
+        async with get_db().polls.watch(pipeline) as stream:
+            logger.info("following polls change stream")
+            async for change in stream:
+                self.mark([change["documentKey"]["_id"]])
+
+    async def follow_watermark(self):
+        logger.info("change streams unavailable, polling votes.updated_at")
+        db = get_db()
+        watermark = datetime.utcnow()
+        while True:
+            cursor = db.votes.find({"updated_at": {"$gt": watermark}}, {"poll_id": 1, "updated_at": 1}).sort("updated_at", 1)
+            async for vote in cursor:
+                self.mark([vote["poll_id"]])
+                watermark = vote["updated_at"]
+            await asyncio.sleep(self.interval_seconds)
+
+    async def follow(self):
+        try:
+            await self.follow_change_stream()
+        except OperationFailure as exc:
+            # 40573: "The $changeStream stage is only supported on replica sets"
+            logger.debug("change stream failed: %s", exc)
+            await self.follow_watermark()
+
+    def settled(self) -> List[ObjectId]:
+        cutoff = time.monotonic() - self.settle_seconds
+        ready = [pid for pid, seen in self.dirty.items() if seen <= cutoff]
+        return ready[: self.batch_size]
+
+    async def _counters(self, poll_ids: List[ObjectId]) -> Dict[ObjectId, Dict[str, int]]:
+        counters = {}
+        # closed polls have frozen counts and their votes archived
+        async for poll in get_db().polls.find({"_id": {"$in": poll_ids}, "active": {"$ne": False}}, {"options.id": 1, "options.count": 1}):
+            counters[poll["_id"]] = {opt["id"]: opt.get("count", 0) for opt in poll.get("options", [])}
+        return counters
+
+    async def reconcile(self, poll_ids: List[ObjectId]) -> int:
+        """
+        Recount votes for `poll_ids` with one grouped aggregation, reading the
+        counters before and after it. A poll is corrected only when both reads
+        agree and the previous pass saw the same drift: a delta still waiting
+        in an API worker's write-behind buffer looks like drift once, then
+        goes away with the flush. Each fix is an $inc guarded on the value we
+        observed, so a vote landing concurrently is never overwritten, and is
+        announced as `poll_updated` so caches and websocket clients refresh.
+        Returns the number of polls corrected.
+        """
+        db = get_db()
+        before = await self._counters(poll_ids)
+        actual: Dict[ObjectId, Dict[str, int]] = {pid: {} for pid in poll_ids}
+        pipeline = [
+            {"$match": {"poll_id": {"$in": poll_ids}}},
+            {"$group": {"_id": {"poll_id": "$poll_id", "option_id": "$option_id"}, "count": {"$sum": 1}}},
+        ]
+        async for row in db.votes.aggregate(pipeline):
+            actual[row["_id"]["poll_id"]][row["_id"]["option_id"]] = row["count"]
+        after = await self._counters(list(before))
+
+        corrected = 0
+        for poll_id in poll_ids:
+            observed = after.get(poll_id)
+            if observed is None:
+                self.suspects.pop(poll_id, None)
+                continue
+            if before[poll_id] != observed:
+                # counters moved during the recount; look again once settled
+                self.suspects.pop(poll_id, None)
+                self.mark([poll_id])
+                continue
+            counts = actual[poll_id]
+            diffs = {opt_id: counts.get(opt_id, 0) - n for opt_id, n in observed.items() if counts.get(opt_id, 0) != n}
+            if not diffs:
+                self.suspects.pop(poll_id, None)
+                continue
+            signature = (sorted(observed.items()), sorted(diffs.items()))
+            if self.suspects.get(poll_id) != signature:
+                self.suspects[poll_id] = signature
+                self.mark([poll_id])
+                continue
+            del self.suspects[poll_id]
+
+            inc = {}
+            array_filters = []
+            for i, (opt_id, diff) in enumerate(diffs.items()):
+                inc[f"options.$[o{i}].count"] = diff
+                array_filters.append({f"o{i}.id": opt_id, f"o{i}.count": observed[opt_id]})
+            logger.info("poll %s drifted: %s", poll_id, diffs)
+            result = await db.polls.update_one({"_id": poll_id}, {"$inc": inc}, array_filters=array_filters)
+            if result.modified_count:
+                corrected += 1
+                doc = await db.polls.find_one({"_id": poll_id})
+                if doc is not None:
+                    await publish_poll_event("poll_updated", poll_id, poll=raw(encode_poll(doc)))
+        return corrected
+
+    async def run_pass(self):
+        poll_ids = self.settled()
+        if not poll_ids:
+            return
+        for pid in poll_ids:
+            self.dirty.pop(pid, None)
+        started = time.perf_counter()
+        try:
+            corrected = await self.reconcile(poll_ids)
+        except Exception:
+            self.mark(poll_ids)
+            raise
+        logger.info(
+            "reconciled %d polls (%d corrected) in %.1f ms, %d pending",
+            len(poll_ids), corrected, (time.perf_counter() - started) * 1000, len(self.dirty),
+        )
+
+    async def mark_all(self):
+        async for poll in get_db().polls.find({}, {"_id": 1}):
+            self.dirty[poll["_id"]] = 0.0
+
+    async def run(self, check_all: bool = False):
+        if check_all:
+            await self.mark_all()
+        follower = asyncio.create_task(self.follow())
+        try:
+            while True:
+                try:
+                    await self.run_pass()
+                except Exception:
+                    logger.exception("reconcile pass failed")
+                if follower.done():
+                    # surface follower crashes instead of silently idling
+                    follower.result()
+                await asyncio.sleep(self.interval_seconds)
+        finally:
+            follower.cancel()
+
+
+reconciler = Reconciler(
+    settle_seconds=settings.RECONCILE_SETTLE_SECONDS,
+    interval_seconds=settings.RECONCILE_INTERVAL_SECONDS,
+    batch_size=settings.RECONCILE_BATCH_SIZE,
+)
+
+
+async def main(check_all: bool = False):
+    # corrections are published so API caches and websocket clients refresh
+    await broadcaster.connect()
+    try:
+        await reconciler.run(check_all)
+    finally:
+        await broadcaster.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(check_all="--all" in sys.argv))
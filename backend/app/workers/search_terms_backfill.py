@@ -0,0 +1,46 @@
+"""
+Set `search_terms` on polls created before prefix search existed.
+
+    python -m app.workers.search_terms_backfill        # polls without search_terms
+    python -m app.workers.search_terms_backfill --all  # recompute every poll
+"""
+import asyncio
+import logging
+import sys
+import time
+
+from pymongo import UpdateOne
+
+from app.db.client import get_db
+from app.utils.text import search_terms
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(recompute: bool = False, batch_size: int = 1000) -> int:
+    """One streaming pass over polls, writing terms in unordered bulk batches."""
+    db = get_db()
+    scope = {} if recompute else {"search_terms": {"$exists": False}}
+    ops = []
+    updated = 0
+    async for poll in db.polls.find(scope, {"question": 1}, batch_size=batch_size):
+        ops.append(UpdateOne({"_id": poll["_id"]}, {"$set": {"search_terms": search_terms(poll.get("question") or "")}}))
+        if len(ops) >= batch_size:
+            await db.polls.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await db.polls.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+
+async def main(recompute: bool = False):
+    started = time.perf_counter()
+    updated = await backfill(recompute)
+    logger.info("set search_terms on %d polls in %.1fs", updated, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main("--all" in sys.argv[1:]))
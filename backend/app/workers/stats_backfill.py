@@ -0,0 +1,27 @@
+"""
+Rebuild poll_stats buckets from the votes collection.
+
+    python -m app.workers.stats_backfill            # every poll
+    python -m app.workers.stats_backfill <poll_id>  # one poll
+"""
+import asyncio
+import logging
+import sys
+import time
+
+from bson import ObjectId
+
+from app.services.analytics import analytics
+
+logger = logging.getLogger(__name__)
+
+
+async def main(poll_id: str | None = None):
+    started = time.perf_counter()
+    seen = await analytics.backfill(ObjectId(poll_id) if poll_id else None)
+    logger.info("backfilled %d votes in %.1fs", seen, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,228 @@
+"""
+In-process benchmark harness.
+
+Drives `app.main:app` through httpx's ASGI transport, with the in-memory
+broadcaster and a real MongoDB (or mongomock-motor for the scenarios that
+never write vote counters; see benchmarks.scenarios.NEEDS_MONGO). Every
+collection call the app makes goes through a counting proxy, so results can
+report Mongo operations per request next to latency and throughput.
+
+Needs the dev-only packages `httpx` and `mongomock-motor`.
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+BENCH_DB = "quickpoll_bench"
+
+# collection methods that cost (at least) one round trip; cursor getMores are not counted
+MONGO_OPS = {
+    "find", "find_one", "insert_one", "insert_many", "replace_one",
+    "update_one", "update_many", "delete_one", "delete_many",
+    "find_one_and_update", "find_one_and_delete", "bulk_write",
+    "aggregate", "count_documents", "estimated_document_count",
+}
+
+
+def configure(mongo_uri: Optional[str] = None):
+    """Settings are read at import time, so this must run before anything imports `app`."""
+    os.environ["BROADCAST_BACKEND"] = "memory"
+    os.environ["MONGO_DB"] = BENCH_DB
+    os.environ["MONGO_URI"] = mongo_uri or "mongodb://localhost:27017"
+    # mongomock has no real index support; a real server syncs them at startup as usual
+    os.environ["MONGO_SYNC_INDEXES"] = "true" if mongo_uri else "false"
+    # every simulated voter shares one client IP; measure the handlers, not the limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379")
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+
+
+class OpCounter:
+    def __init__(self):
+        self.total = 0
+        self.by_op: Counter = Counter()
+
+    def add(self, collection: str, op: str):
+        self.total += 1
+        self.by_op[f"{collection}.{op}"] += 1
+
+    def snapshot(self):
+        return self.total, Counter(self.by_op)
+
+
+class _CountingCollection:
+    def __init__(self, collection, counter: OpCounter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in MONGO_OPS:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counter.add(self._collection.name, name)
+            return attr(*args, **kwargs)
+        return counted
+
+
+class _CountingDatabase:
+    def __init__(self, db, counter: OpCounter):
+        self._db = db
+        self._counter = counter
+
+    def __getattr__(self, name):
+        # the app only ever reaches collections as attributes (db.polls, db.votes, ...)
+        if name.startswith("_"):
+            return getattr(self._db, name)
+        return _CountingCollection(self._db[name], self._counter)
+
+    def __getitem__(self, name):
+        return _CountingCollection(self._db[name], self._counter)
+
+
+class CountingClient:
+    """Stands in for the Motor client in app.db.client; `get_db()` goes through it."""
+
+    def __init__(self, client, counter: OpCounter):
+        self._client = client
+        self._counter = counter
+
+    def __getitem__(self, name):
+        return _CountingDatabase(self._client[name], self._counter)
+
+    def get_database(self, name, **kwargs):
+        return _CountingDatabase(self._client.get_database(name, **kwargs), self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int, ops: int, by_op: Counter) -> dict:
+    latencies = sorted(latencies)
+    n = len(latencies)
+
+    def pct(p: float) -> float:
+        return round(latencies[min(n - 1, int(p * n))] * 1000, 3) if n else 0.0
+
+    return {
+        "requests": n,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(n / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "max_ms": pct(1.0),
+        "mongo_ops": ops,
+        "mongo_ops_per_request": round(ops / n, 3) if n else 0.0,
+        "mongo_ops_by_command": dict(by_op.most_common()),
+    }
+
+
+class Harness:
+    """
+    Async context manager owning one app instance for a benchmark run:
+
+        async with Harness() as h:
+            poll_id = await h.create_poll()
+            result = await h.measure(requests, concurrency=50)
+    """
+
+    def __init__(self, mongo_uri: Optional[str] = None):
+        self.mongo_uri = mongo_uri
+        self.ops = OpCounter()
+        self.http = None
+        self.app = None
+        self._backing = None
+
+    async def __aenter__(self):
+        import httpx
+        from app.db import client as db_client
+
+        if self.mongo_uri:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            backing = AsyncIOMotorClient(self.mongo_uri)
+            await backing.drop_database(BENCH_DB)
+        else:
+            from mongomock_motor import AsyncMongoMockClient
+            backing = AsyncMongoMockClient()
+        self._backing = backing
+        # the app's startup hook connects (and syncs indexes) through this client
+        db_client.client = CountingClient(backing, self.ops)
+        db_client.read_db = None
+
+        from app.main import app
+        self.app = app
+        await app.router.startup()
+        self.http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.aclose()
+        await self.app.router.shutdown()
+        if self.mongo_uri:
+            await self._backing.drop_database(BENCH_DB)
+
+    @property
+    def db(self):
+        from app.db.client import get_db
+        return get_db()
+
+    def auth(self, user_id: str) -> dict:
+        from app.core.jwt import create_access_token
+        return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+    async def create_poll(self, owner: str = "bench-owner", options: int = 4) -> dict:
+        payload = {
+            "question": "Which option wins the benchmark?",
+            "options": [{"id": str(i), "text": f"Option {i}"} for i in range(options)],
+        }
+        resp = await self.http.post("/polls/", json=payload, headers=self.auth(owner))
+        resp.raise_for_status()
+        return resp.json()
+
+    async def settle(self):
+        """
+        Flush write-behind state so its Mongo ops land inside the measured
+        window. A failed flush only logs and re-queues in the app, so anything
+        still pending afterwards fails the scenario rather than reporting
+        counts that never reached the database.
+        """
+        from app.services.vote_buffer import vote_buffer
+        await vote_buffer.flush()
+        stuck = vote_buffer.stats()["polls"]
+        if stuck:
+            raise RuntimeError(f"vote buffer flush failed for {stuck} polls")
+
+    async def measure(self, requests: Iterable[Callable[[], Awaitable]], concurrency: int) -> dict:
+        """
+        Run `requests` (zero-arg callables returning an httpx response) with
+        `concurrency` in flight and summarize latency, throughput and the Mongo
+        operations issued meanwhile, write-behind flushes included.
+        """
+        pending = iter(requests)
+        latencies: List[float] = []
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for make in pending:
+                started = time.perf_counter()
+                try:
+                    resp = await make()
+                    if resp.status_code >= 400:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        ops_before, by_op_before = self.ops.snapshot()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        await self.settle()
+        elapsed = time.perf_counter() - started
+        ops_after, by_op_after = self.ops.snapshot()
+        return summarize(latencies, elapsed, errors, ops_after - ops_before, by_op_after - by_op_before)
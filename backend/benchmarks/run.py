@@ -0,0 +1,84 @@
+"""
+Benchmark runner; run from backend/:
+
+    python -m benchmarks.run --mongo-uri mongodb://localhost:27017 --out bench.json
+    python -m benchmarks.run votes_one_poll ws_fanout --mongo-uri mongodb://localhost:27017 --scale 0.1
+    python -m benchmarks.run                                  # mongomock: only scenarios that cast no votes
+
+Prints (or writes) one JSON document keyed by scenario, tagged with the git
+commit, so runs can be compared between commits.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.harness import configure
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    from benchmarks.harness import Harness
+    from benchmarks.scenarios import NEEDS_MONGO, SCENARIOS
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+    if not args.mongo_uri:
+        blocked = [n for n in names if n in NEEDS_MONGO]
+        if args.scenarios and blocked:
+            sys.exit(f"{', '.join(blocked)} need a real MongoDB; pass --mongo-uri")
+        if blocked:
+            logging.warning("no --mongo-uri, skipping %s", ", ".join(blocked))
+            names = [n for n in names if n not in NEEDS_MONGO]
+
+    results = {}
+    for name in names:
+        # a fresh database and startup/shutdown cycle per scenario
+        async with Harness(args.mongo_uri) as h:
+            logging.info("running %s", name)
+            results[name] = await SCENARIOS[name](h, args.scale, args.concurrency)
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "mongo": "mongodb" if args.mongo_uri else "mongomock",
+        "scale": args.scale,
+        "concurrency": args.concurrency,
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QuickPoll in-process benchmarks")
+    parser.add_argument("scenarios", nargs="*", help="scenarios to run (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for scenario sizes")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--mongo-uri", help="MongoDB to benchmark against (uses a scratch database); "
+                                             "required by every scenario that casts votes")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    configure(args.mongo_uri)
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Benchmark scenarios. Each takes the running Harness and the CLI options and
+returns a JSON-serializable result; sizes are multiplied by `--scale`.
+
+Scenarios that cast votes need a real MongoDB: vote counters are written
+with arrayFilters, which mongomock does not implement.
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Set
+
+from bson import ObjectId
+
+from benchmarks.harness import Harness, summarize
+
+SCENARIOS: Dict[str, Callable] = {}
+# scenarios that cannot run against mongomock
+NEEDS_MONGO: Set[str] = set()
+
+
+def scenario(name: str, needs_mongo: bool = False):
+    def register(fn):
+        SCENARIOS[name] = fn
+        if needs_mongo:
+            NEEDS_MONGO.add(name)
+        return fn
+    return register
+
+
+def scaled(n: int, scale: float) -> int:
+    return max(1, int(n * scale))
+
+
+@scenario("votes_one_poll", needs_mongo=True)
+async def votes_one_poll(h: Harness, scale: float, concurrency: int) -> dict:
+    """10k distinct voters casting one vote each on the same poll."""
+    voters = scaled(10_000, scale)
+    poll = await h.create_poll(options=4)
+    options = [o["id"] for o in poll["options"]]
+    headers = [h.auth(f"voter-{i}") for i in range(voters)]
+
+    def vote(i):
+        return lambda: h.http.post(f"/polls/{poll['_id']}/vote", json={"option_id": options[i % 4]}, headers=headers[i])
+
+    result = await h.measure((vote(i) for i in range(voters)), concurrency)
+    stored = await h.db.polls.find_one({"_id": ObjectId(poll["_id"])})
+    result["counted_votes"] = sum(o.get("count", 0) for o in stored["options"])
+    return result
+
+
+@scenario("vote_switches", needs_mongo=True)
+async def vote_switches(h: Harness, scale: float, concurrency: int) -> dict:
+    """The same voters switching back and forth between two options."""
+    voters = scaled(1_000, scale)
+    rounds = 5
+    poll = await h.create_poll(options=2)
+    options = [o["id"] for o in poll["options"]]
+    headers = [h.auth(f"switcher-{i}") for i in range(voters)]
+
+    def vote(i, r):
+        return lambda: h.http.post(f"/polls/{poll['_id']}/vote", json={"option_id": options[r % 2]}, headers=headers[i])
+
+    return await h.measure((vote(i, r) for r in range(rounds) for i in range(voters)), concurrency)
+
+
+@scenario("likes_one_poll")
+async def likes_one_poll(h: Harness, scale: float, concurrency: int) -> dict:
+    """10k users liking the same poll."""
+    users = scaled(10_000, scale)
+    poll = await h.create_poll()
+    headers = [h.auth(f"liker-{i}") for i in range(users)]
+
+    def like(i):
+        return lambda: h.http.post(f"/polls/{poll['_id']}/like", headers=headers[i])
+
+    return await h.measure((like(i) for i in range(users)), concurrency)
+
+
+@scenario("list_polls_deep")
+async def list_polls_deep(h: Harness, scale: float, concurrency: int) -> dict:
+    """
+    Walk every page of a 5k poll listing, once with offset pages and once
+    with keyset cursors. Pages are fetched one after another (each keyset
+    page needs the previous cursor), so concurrency does not apply.
+    """
+    from app.utils.text import search_terms
+
+    polls = scaled(5_000, scale)
+    limit = 50
+    start = datetime.utcnow() - timedelta(days=1)
+    docs = []
+    for i in range(polls):
+        question = f"Benchmark poll number {i}"
+        created = start + timedelta(seconds=i)
+        docs.append({
+            "question": question,
+            "search_terms": search_terms(question),
+            "options": [{"id": str(j), "text": f"Option {j}", "count": 0} for j in range(4)],
+            "likes": 0,
+            "owner_id": f"owner-{i % 100}",
+            "active": True,
+            "expires_at": None,
+            "created_at": created,
+            "updated_at": created,
+        })
+    await h.db.polls.insert_many(docs)
+    pages = (polls + limit - 1) // limit
+
+    offset = await _sequential(h, [f"/polls/?limit={limit}&page={p}" for p in range(1, pages + 1)])
+
+    cursor = ""
+    latencies = []
+    ops_before, by_op_before = h.ops.snapshot()
+    started = time.perf_counter()
+    while cursor is not None:
+        t = time.perf_counter()
+        resp = await h.http.get("/polls/", params={"limit": limit, "cursor": cursor})
+        latencies.append(time.perf_counter() - t)
+        resp.raise_for_status()
+        cursor = resp.json()["next_cursor"]
+    ops_after, by_op_after = h.ops.snapshot()
+    keyset = summarize(latencies, time.perf_counter() - started, 0, ops_after - ops_before, by_op_after - by_op_before)
+
+    return {"polls": polls, "limit": limit, "offset": offset, "keyset": keyset}
+
+
+@scenario("page_render_my_state", needs_mongo=True)
+async def page_render_my_state(h: Harness, scale: float, concurrency: int) -> dict:
+    """
+    One page of 10 polls plus the caller's vote on each: the list call
+    followed by a my-vote call per poll, versus list_polls with
+    include_my_state. Each "request" below is a whole page render.
+    """
+    renders = scaled(500, scale)
+    headers = h.auth("page-viewer")
+    for i in range(10):
+        poll = await h.create_poll()
+        if i % 2 == 0:
+            await h.http.post(f"/polls/{poll['_id']}/vote", json={"option_id": poll["options"][0]["id"]}, headers=headers)
+    await h.settle()
+
+    async def n_plus_one():
+        resp = await h.http.get("/polls/", params={"limit": 10})
+        for poll in resp.json()["results"]:
+            await h.http.get(f"/polls/{poll['_id']}/my-vote", headers=headers)
+        return resp
+
+    def embedded():
+        return h.http.get("/polls/", params={"limit": 10, "include_my_state": "true"}, headers=headers)
+
+    return {
+        "n_plus_one": await h.measure((n_plus_one for _ in range(renders)), concurrency),
+        "include_my_state": await h.measure((embedded for _ in range(renders)), concurrency),
+    }
+
+
+@scenario("ws_fanout", needs_mongo=True)
+async def ws_fanout(h: Harness, scale: float, concurrency: int) -> dict:
+    """
+    5k websocket subscribers on one poll while votes come in. Sockets are
+    in-memory fakes registered with the hub, so this measures the server
+    side of fan-out (queueing and sender tasks), not network I/O.
+    """
+    from app.core.broadcaster import subscribe, unsubscribe, CHANNEL_NAME
+    from app.services.broadcast import hub, poll_topic
+
+    clients = scaled(5_000, scale)
+    events = 200
+    poll = await h.create_poll(options=4)
+    options = [o["id"] for o in poll["options"]]
+
+    published = []
+    completed = [0.0] * events
+    delivered = [0] * events
+
+    def on_publish(data):
+        published.append(time.perf_counter())
+
+    class FakeSocket:
+        def __init__(self):
+            self.received = 0
+            self.closed = False
+
+        async def send_text(self, data):
+            if self.received < events:
+                delivered[self.received] += 1
+                if delivered[self.received] == clients:
+                    completed[self.received] = time.perf_counter()
+            self.received += 1
+
+        async def close(self, code=1000):
+            self.closed = True
+
+    sockets = [FakeSocket() for _ in range(clients)]
+    registered = [hub.register(s, [poll_topic(poll["_id"])]) for s in sockets]
+    await subscribe(CHANNEL_NAME, on_publish)
+    try:
+        headers = [h.auth(f"ws-voter-{i}") for i in range(events)]
+
+        def vote(i):
+            return lambda: h.http.post(f"/polls/{poll['_id']}/vote", json={"option_id": options[i % 4]}, headers=headers[i])
+
+        requests = await h.measure((vote(i) for i in range(events)), concurrency)
+        deadline = time.perf_counter() + 30
+        while not all(completed) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+    finally:
+        await unsubscribe(CHANNEL_NAME, on_publish)
+        for client in registered:
+            hub.unregister(client)
+
+    done = [c - p for c, p in zip(completed, published) if c]
+    fanout = summarize(done, max(completed) - published[0] if done else 0.0, events - len(done), 0, Counter())
+    return {
+        "clients": clients,
+        "events": events,
+        "requests": requests,
+        "fanout_p50_ms": fanout["p50_ms"],
+        "fanout_p99_ms": fanout["p99_ms"],
+        "deliveries_per_s": round(sum(delivered) / fanout["elapsed_s"], 1) if fanout["elapsed_s"] else 0.0,
+        "incomplete_events": events - len(done),
+        "dropped_clients": sum(1 for s in sockets if s.closed),
+    }
+
+
+@scenario("ws_slow_consumers", needs_mongo=True)
+async def ws_slow_consumers(h: Harness, scale: float, concurrency: int) -> dict:
+    """
+    2k subscribers on one poll, a tenth of them slow, with more events than
+    a send queue holds. Lagging clients should have their backlog collapsed
+    into a snapshot rather than be dropped, and every client should end on
+    the poll's final seq.
+    """
+    from app.core import metrics
+    from app.core.broadcaster import current_seq
+    from app.core.config import settings
+    from app.services.broadcast import hub, poll_topic
+    from app.utils.serializers import loads
+
+    clients = scaled(2_000, scale)
+    events = settings.WS_SEND_QUEUE_SIZE * 2
+    poll = await h.create_poll(options=4)
+    options = [o["id"] for o in poll["options"]]
+
+    class FakeSocket:
+        def __init__(self, delay: float):
+            self.delay = delay
+            self.received = 0
+            self.snapshots = 0
+            self.seq = 0
+            self.closed = False
+
+        async def send_text(self, data):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            message = loads(data)
+            self.received += 1
+            if message.get("action") == "snapshot":
+                self.snapshots += 1
+            self.seq = max(self.seq, message.get("seq", 0))
+
+        async def close(self, code=1000):
+            self.closed = True
+
+    sockets = [FakeSocket(0.02 if i % 10 == 0 else 0.0) for i in range(clients)]
+    registered = [hub.register(s, [poll_topic(poll["_id"])]) for s in sockets]
+    try:
+        headers = [h.auth(f"slow-voter-{i}") for i in range(events)]
+
+        def vote(i):
+            return lambda: h.http.post(f"/polls/{poll['_id']}/vote", json={"option_id": options[i % 4]}, headers=headers[i])
+
+        requests = await h.measure((vote(i) for i in range(events)), concurrency)
+        # scrape while queues are backed up: the websocket gauges read live client state
+        if metrics.ENABLED:
+            (await h.http.get("/metrics")).raise_for_status()
+        final_seq = await current_seq(poll["_id"])
+        started = time.perf_counter()
+        deadline = started + 60
+        while time.perf_counter() < deadline and any(s.seq < final_seq and not s.closed for s in sockets):
+            await asyncio.sleep(0.05)
+        converge_s = time.perf_counter() - started
+    finally:
+        for client in registered:
+            hub.unregister(client)
+
+    slow = [s for s in sockets if s.delay]
+    return {
+        "clients": clients,
+        "slow_clients": len(slow),
+        "events": events,
+        "requests": requests,
+        "converged_clients": sum(1 for s in sockets if s.seq >= final_seq),
+        "dropped_clients": sum(1 for s in sockets if s.closed),
+        "slow_messages_received_avg": round(sum(s.received for s in slow) / len(slow), 1) if slow else 0.0,
+        "slow_snapshots_avg": round(sum(s.snapshots for s in slow) / len(slow), 1) if slow else 0.0,
+        "drain_s": round(converge_s, 3),
+    }
+
+
+async def _sequential(h: Harness, urls) -> dict:
+    latencies = []
+    errors = 0
+    ops_before, by_op_before = h.ops.snapshot()
+    started = time.perf_counter()
+    for url in urls:
+        t = time.perf_counter()
+        resp = await h.http.get(url)
+        latencies.append(time.perf_counter() - t)
+        if resp.status_code >= 400:
+            errors += 1
+    ops_after, by_op_after = h.ops.snapshot()
+    return summarize(latencies, time.perf_counter() - started, errors, ops_after - ops_before, by_op_after - by_op_before)